@@ -0,0 +1,52 @@
+"""
+Benchmark the single-pass property extraction engine, and the structured-data fast path
+in front of it, against the previous extractors.
+
+Usage: python benchmarks/bench_extraction.py [--iterations N] [page.html ...]
+Pages default to the saved listings in benchmarks/pages.
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import legacy_extraction
+from src.services.property_extractor import extract_from_html, extract_listing, HTML_PARSER
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+def time_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = fn()
+    return (time.perf_counter() - start) / iterations * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('pages', nargs='*')
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    pages = args.pages or sorted(glob.glob(os.path.join(PAGES_DIR, '*.html')))
+    print(f"parser: {HTML_PARSER}")
+    print(f"{'page':<24}{'size':>10}{'legacy ms':>12}{'engine ms':>12}{'speedup':>10}{'listing ms':>12}  strategy / same output")
+
+    for path in pages:
+        with open(path, 'rb') as f:
+            content = f.read()
+        url = 'https://listings.example.com/' + os.path.splitext(os.path.basename(path))[0]
+
+        legacy_ms, legacy_info = time_call(lambda: legacy_extraction.extract_property_info(content, url), args.iterations)
+        engine_ms, engine_info = time_call(lambda: extract_from_html(content, url), args.iterations)
+        listing_ms, (_, strategy) = time_call(lambda: extract_listing(content, url), args.iterations)
+
+        print(f"{os.path.basename(path):<24}{len(content):>10}{legacy_ms:>12.2f}{engine_ms:>12.2f}"
+              f"{legacy_ms / engine_ms:>9.1f}x{listing_ms:>12.2f}  {strategy} / {legacy_info == engine_info}")
+        if legacy_info != engine_info:
+            print(f"    legacy: {legacy_info}\n    engine: {engine_info}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Time the Jinja2 email templates: a render from the compiled-template cache against one that
+compiles the template first, which preload_email_templates() keeps off the request path.
+The templates are there for HTML escaping and the shared layout, not speed; the f-strings
+they replaced rendered in a few microseconds. tests/test_email_templates.py pins their output.
+
+Usage: python benchmarks/bench_templates.py [--iterations N]
+"""
+import os
+import re
+import sys
+import html
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.routes import email_service
+from src.services import email_templates
+
+PROPERTY_INFO = {
+    'title': 'Stunning 4 Bedroom Villa with Ocean Views',
+    'type': 'luxury_home',
+    'location': '123 Ocean Drive, Malibu, CA 90265',
+    'price': '$4,250,000',
+    'features': ['4 bedrooms', '3 bathrooms', '3,200 sq ft', 'pool', 'fireplace'],
+    'description': 'A beautifully renovated villa overlooking the Pacific with an infinity pool and private garden.'
+}
+ORDER_DETAILS = {
+    'property_url': 'https://listings.example.com/stunning-villa-malibu',
+    'music_type': 'Upbeat Modern',
+    'voiceover': True,
+    'branding_asset': 'logo.png'
+}
+RECORD = {'order_status': 'pending', 'created_at': '2025-06-20T10:00:00Z'}
+CUSTOMER = {'name': 'Jane Smith', 'email': 'jane@example.com'}
+COMPLETION = {
+    'video_file_url': 'https://cdn.example.com/video.mp4',
+    'video_thumbnail_url': 'https://cdn.example.com/thumb.jpg',
+    'music_type': 'Upbeat Modern',
+    'voiceover': True,
+    'created_at': '2025-06-20T10:00:00Z',
+    'completed_at': '2025-06-21T08:00:00Z'
+}
+
+def renderers(module):
+    """
+    A no-argument render function per email, rendering the sample order through module
+    """
+    enhanced_content = email_service.create_enhanced_personalized_content(
+        CUSTOMER['name'], PROPERTY_INFO['title'], PROPERTY_INFO, ORDER_DETAILS)
+    professional_content = email_service.create_personalized_content(
+        CUSTOMER['name'], PROPERTY_INFO['title'], PROPERTY_INFO['type'], 'Premium Video Package', ORDER_DETAILS)
+    return {
+        'order_confirmation': lambda: module.generate_enhanced_html_email(
+            CUSTOMER['name'], PROPERTY_INFO['title'], PROPERTY_INFO, enhanced_content, ORDER_DETAILS),
+        'professional_confirmation': lambda: module.generate_professional_html_email(
+            CUSTOMER['name'], PROPERTY_INFO['title'], professional_content, 'Premium Video Package'),
+        'admin_notification': lambda: module.generate_admin_notification_email(
+            'order-123', CUSTOMER, PROPERTY_INFO, ORDER_DETAILS, RECORD),
+        'video_completion': lambda: module.generate_video_completion_email(
+            CUSTOMER['name'], PROPERTY_INFO['title'], PROPERTY_INFO, COMPLETION)
+    }
+
+def normalize(markup):
+    """
+    The <body> markup with whitespace between tags collapsed and entities decoded
+    """
+    body = markup[markup.index('<body>'):]
+    return re.sub(r'\s+', ' ', re.sub(r'>\s+<', '><', html.unescape(body))).strip()
+
+def time_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = fn()
+    return (time.perf_counter() - start) / iterations * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    current = renderers(email_service)
+
+    start = time.perf_counter()
+    for render in current.values():
+        render()
+    print(f"first render (compile) of all templates: {(time.perf_counter() - start) * 1000:.2f} ms")
+    print(f"cached templates: {len(email_templates.email_environment.cache)}")
+    print(f"{'email':<28}{'cached ms':>14}{'uncached ms':>14}")
+
+    cached_environment = email_templates.email_environment
+    uncached_environment = cached_environment.overlay(cache_size=0)
+
+    for name, render in current.items():
+        cached_ms, _ = time_call(render, args.iterations)
+
+        email_templates.email_environment = uncached_environment
+        try:
+            uncached_ms, _ = time_call(render, max(1, args.iterations // 100))
+        finally:
+            email_templates.email_environment = cached_environment
+
+        print(f"{name:<28}{cached_ms:>14.4f}{uncached_ms:>14.4f}")
+
+if __name__ == '__main__':
+    main()
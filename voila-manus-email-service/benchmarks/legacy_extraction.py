@@ -0,0 +1,188 @@
+"""
+Property extraction as it was before the single-pass engine in src/services/property_extractor.py.
+Kept only as the baseline for bench_extraction.py.
+"""
+import re
+from bs4 import BeautifulSoup
+
+def extract_property_info(content, property_url):
+    soup = BeautifulSoup(content, 'html.parser')
+    return {
+        'title': extract_property_title(soup, property_url),
+        'type': extract_property_type(soup),
+        'location': extract_location(soup),
+        'price': extract_price(soup),
+        'features': extract_key_features(soup),
+        'description': extract_description(soup)
+    }
+
+def extract_property_title(soup, url):
+    """
+    Manus extracts property title using multiple strategies
+    """
+    # Strategy 1: Page title
+    title_tag = soup.find('title')
+    if title_tag:
+        title = title_tag.get_text().strip()
+        # Clean up common title patterns
+        title = re.sub(r'\s*\|\s*.*$', '', title)  # Remove site name after |
+        title = re.sub(r'\s*-\s*.*$', '', title)   # Remove site name after -
+        if len(title) > 10 and 'for sale' in title.lower() or 'for rent' in title.lower():
+            return title
+    
+    # Strategy 2: H1 tags
+    h1_tags = soup.find_all('h1')
+    for h1 in h1_tags:
+        text = h1.get_text().strip()
+        if len(text) > 10 and len(text) < 200:
+            return text
+    
+    # Strategy 3: Property-specific selectors
+    selectors = [
+        '[data-testid="property-title"]',
+        '.property-title',
+        '.listing-title',
+        '.property-address',
+        '.address'
+    ]
+    
+    for selector in selectors:
+        element = soup.select_one(selector)
+        if element:
+            text = element.get_text().strip()
+            if len(text) > 5:
+                return text
+    
+    # Strategy 4: Meta tags
+    meta_title = soup.find('meta', property='og:title')
+    if meta_title:
+        return meta_title.get('content', '').strip()
+    
+    # Fallback
+    return generate_title_from_url(url)
+
+def generate_title_from_url(url):
+    """
+    Generate a title from URL as fallback
+    """
+    try:
+        # Extract meaningful parts from URL
+        parts = url.split('/')
+        for part in reversed(parts):
+            if part and len(part) > 3:
+                # Clean up URL part
+                title = part.replace('-', ' ').replace('_', ' ')
+                title = re.sub(r'\d+', '', title)  # Remove numbers
+                title = ' '.join(word.capitalize() for word in title.split() if len(word) > 2)
+                if len(title) > 5:
+                    return f"Property at {title}"
+        
+        return "Beautiful Property"
+    except:
+        return "Beautiful Property"
+
+def extract_property_type(soup):
+    """
+    Manus determines property type from page content
+    """
+    text_content = soup.get_text().lower()
+    
+    # Property type detection patterns
+    if any(word in text_content for word in ['condo', 'condominium', 'unit']):
+        return 'condominium'
+    elif any(word in text_content for word in ['townhouse', 'townhome', 'row house']):
+        return 'townhouse'
+    elif any(word in text_content for word in ['apartment', 'apt']):
+        return 'apartment'
+    elif any(word in text_content for word in ['commercial', 'office', 'retail', 'warehouse']):
+        return 'commercial'
+    elif any(word in text_content for word in ['luxury', 'estate', 'mansion', 'villa']):
+        return 'luxury_home'
+    else:
+        return 'residential_home'
+
+def extract_location(soup):
+    """
+    Extract property location
+    """
+    # Look for address or location information
+    selectors = [
+        '.address', '.location', '.property-address',
+        '[data-testid="address"]', '[data-testid="location"]'
+    ]
+    
+    for selector in selectors:
+        element = soup.select_one(selector)
+        if element:
+            return element.get_text().strip()
+    
+    return ''
+
+def extract_price(soup):
+    """
+    Extract property price
+    """
+    # Look for price information
+    selectors = [
+        '.price', '.property-price', '.listing-price',
+        '[data-testid="price"]'
+    ]
+    
+    for selector in selectors:
+        element = soup.select_one(selector)
+        if element:
+            price_text = element.get_text().strip()
+            if '$' in price_text:
+                return price_text
+    
+    return ''
+
+def extract_key_features(soup):
+    """
+    Extract key property features
+    """
+    features = []
+    text_content = soup.get_text().lower()
+    
+    # Common features to look for
+    feature_patterns = [
+        (r'(\d+)\s*bed', 'bedrooms'),
+        (r'(\d+)\s*bath', 'bathrooms'),
+        (r'(\d+[\d,]*)\s*sq\s*ft', 'square feet'),
+        (r'(\d+)\s*car\s*garage', 'garage'),
+        (r'pool', 'pool'),
+        (r'fireplace', 'fireplace'),
+        (r'garden', 'garden'),
+        (r'balcony', 'balcony')
+    ]
+    
+    for pattern, feature_name in feature_patterns:
+        matches = re.findall(pattern, text_content)
+        if matches:
+            if feature_name in ['bedrooms', 'bathrooms', 'garage']:
+                features.append(f"{matches[0]} {feature_name}")
+            elif feature_name == 'square feet':
+                features.append(f"{matches[0]} sq ft")
+            else:
+                features.append(feature_name)
+    
+    return features[:5]  # Limit to top 5 features
+
+def extract_description(soup):
+    """
+    Extract property description
+    """
+    # Look for description content
+    selectors = [
+        '.description', '.property-description', '.listing-description',
+        '[data-testid="description"]'
+    ]
+    
+    for selector in selectors:
+        element = soup.select_one(selector)
+        if element:
+            desc = element.get_text().strip()
+            if len(desc) > 50:
+                return desc[:500] + '...' if len(desc) > 500 else desc
+    
+    return ''
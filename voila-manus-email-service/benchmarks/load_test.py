@@ -0,0 +1,211 @@
+"""
+Load-test the video-completed webhook under the development server and under gunicorn.
+
+Usage: python benchmarks/load_test.py [--modes dev,gunicorn] [--concurrency 32] [--duration 10] [--profiles-only]
+Each mode runs the service against a throwaway SQLite file, with Supabase and Resend replaced
+by a local stub that answers after --upstream-ms, so the numbers reflect how well the server
+overlaps I/O-bound handlers rather than the real providers. With --profiles-only the stub's
+auth endpoint refuses the anon key, as Supabase does, so users are resolved from the PostgREST
+profiles table.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import uuid
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = {
+    'dev': [sys.executable, 'src/main.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'src.main:app']
+}
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def parse_profile_filter(value):
+    """
+    User ids in a PostgREST user_id filter, either eq.<id> or in.("<id>","<id>")
+    """
+    if value.startswith('eq.'):
+        return [value[3:]]
+    if value.startswith('in.(') and value.endswith(')'):
+        # Items may be double-quoted with backslash escapes, as PostgREST reads them
+        return next(csv.reader([value[4:-1]], quotechar='"', escapechar='\\', doublequote=False))
+    return []
+
+def start_upstream_stub(latency, profiles_only=False):
+    """
+    Serve Supabase user lookups (auth admin users and PostgREST profiles) and Resend sends on
+    a local port, each after `latency` seconds. Returns the base URL and a Counter of requests.
+    """
+    requests_seen = Counter()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path.endswith('/rest/v1/profiles'):
+                requests_seen['profiles'] += 1
+                user_ids = parse_profile_filter(parse_qs(parts.query).get('user_id', [''])[0])
+                self.reply([
+                    {'user_id': user_id, 'email': f'{user_id}@example.com', 'full_name': 'Load Test'}
+                    for user_id in user_ids
+                ])
+                return
+
+            requests_seen['auth'] += 1
+            if profiles_only:
+                self.reply({'msg': 'User not allowed'}, status=403)
+                return
+            user_id = parts.path.rstrip('/').rsplit('/', 1)[-1]
+            self.reply({'email': f'{user_id}@example.com', 'user_metadata': {'full_name': 'Load Test'}})
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+            requests_seen['resend'] += 1
+            if self.path.endswith('/batch'):
+                self.reply({'data': [{'id': str(uuid.uuid4())} for _ in payload]})
+            else:
+                self.reply({'id': str(uuid.uuid4())})
+
+        def reply(self, body, status=200):
+            time.sleep(latency)
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', free_port()), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', requests_seen
+
+def start_service(mode, upstream, database_path):
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        DATABASE_PATH=database_path,
+        SUPABASE_URL=upstream,
+        RESEND_EMAILS_URL=f'{upstream}/emails'
+    )
+    env.pop('DATABASE_URL', None)
+    env.pop('SQLALCHEMY_DATABASE_URI', None)
+    process = subprocess.Popen(COMMANDS[mode], cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f'{base_url}/api/health', timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.2)
+
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+def run_load(base_url, concurrency, duration):
+    """
+    Post webhooks from `concurrency` threads for `duration` seconds; every request uses a new
+    user so the identity cache can't absorb the upstream calls
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        own_latencies = []
+        own_errors = 0
+        while time.monotonic() < stop_at:
+            record = {
+                'id': str(uuid.uuid4()),
+                'user_id': str(uuid.uuid4()),
+                'video_file_url': 'https://cdn.example.com/video.mp4',
+                'video_thumbnail_url': 'https://cdn.example.com/thumb.jpg'
+            }
+            start = time.perf_counter()
+            try:
+                response = session.post(f'{base_url}/api/webhook/supabase/video-completed', json={'record': record}, timeout=30)
+                if response.status_code != 200:
+                    own_errors += 1
+            except requests.RequestException:
+                own_errors += 1
+            own_latencies.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own_latencies)
+            errors.append(own_errors)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': sum(errors),
+        'rps': count / elapsed,
+        'p50_ms': latencies[count // 2] * 1000 if count else 0.0,
+        'p95_ms': latencies[min(count - 1, int(count * 0.95))] * 1000 if count else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modes', default='dev,gunicorn')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--upstream-ms', type=float, default=50)
+    parser.add_argument('--profiles-only', action='store_true')
+    args = parser.parse_args()
+
+    upstream, requests_seen = start_upstream_stub(args.upstream_ms / 1000, args.profiles_only)
+    print(f"{args.concurrency} clients for {args.duration:g}s, upstream latency {args.upstream_ms:g} ms")
+    print(f"{'mode':<10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'auth':>8}{'profiles':>10}{'resend':>8}")
+
+    for mode in args.modes.split(','):
+        requests_seen.clear()
+        with tempfile.TemporaryDirectory() as directory:
+            process, base_url = start_service(mode, upstream, os.path.join(directory, 'load.db'))
+            try:
+                result = run_load(base_url, args.concurrency, args.duration)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+        print(f"{mode:<10}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.1f}"
+              f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{requests_seen['auth']:>8}{requests_seen['profiles']:>10}{requests_seen['resend']:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Production server settings: gunicorn -c gunicorn.conf.py src.main:app
+
+Webhook handlers spend most of their time waiting on Supabase, Resend and listing pages,
+so each worker process runs a pool of threads. Every value can be overridden from the
+environment, and gunicorn's own GUNICORN_CMD_ARGS still applies on top.
+
+Each worker keeps its own metrics and in-memory caches. /api/metrics reports the worker that
+answers the scrape and labels every sample with its pid (worker="..."), so sum across workers
+in queries, e.g. sum without (worker) (rate(voila_upstream_responses_total[5m])). Set
+WEB_CONCURRENCY=1 for exact per-scrape counters.
+"""
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', str(min(multiprocessing.cpu_count() * 2 + 1, 4))))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Resend and listing fetches are bounded by their own HTTP timeouts; this only catches a hung worker
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+# Longer than the usual 60s load balancer idle timeout, so the proxy closes idle connections first
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '75'))
+
+# Recycle workers now and then so a slow leak can't grow forever; worker_exit below lets
+# running jobs finish and flushes queued emails and logs first
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+# Import the app once in the master: table creation, migrations and template compilation run
+# once and the compiled templates are shared copy-on-write
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+# How long an exiting worker waits for its jobs, email batches and log writes; keep it below
+# timeout, after which the master kills the worker
+drain_timeout = float(os.getenv('GUNICORN_DRAIN_TIMEOUT', '20'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+def post_worker_init(worker):
+    """
+    Give the worker its own database connections, then start its background threads
+    """
+    from src.main import app, db, start_background_services
+
+    with app.app_context():
+        # Connections opened in the master before fork must not be shared; close=False leaves
+        # them to the master instead of closing its sockets from here
+        db.engine.dispose(close=False)
+
+    start_background_services()
+
+def worker_exit(server, worker):
+    """
+    Stop the worker's background threads without losing the work they hold
+    """
+    from src.main import stop_background_services
+
+    stop_background_services(drain_timeout)
@@ -1,5 +1,8 @@
 import os
 import sys
+import json
+import time
+import click
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
@@ -7,8 +10,23 @@ from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
 from src.models.email_log import EmailLog
+from src.models.job import Job
+from src.models.property_cache import PropertyCacheEntry
+from src.models.order_record import OrderRecord
+from src.models.email_body import EmailBody, EmailBodyDictionary
+from src.models.idempotency_key import IdempotencyKey
+from src.models.order_property import OrderProperty
+from src.models.customer_cache_invalidation import CustomerCacheInvalidation
+from src.models.migrations import MissingUniqueIndex, dedupe_email_logs, ensure_indexes, ensure_schema
+from src.models.database import configure_database
 from src.routes.user import user_bp
-from src.routes.email_service import email_service_bp
+from src.routes.email_service import email_service_bp, email_dispatcher, profile_resolver
+from src.services.job_queue import start_job_workers
+from src.services.email_templates import preload_email_templates
+from src.services.admin_digest import schedule_admin_digest
+from src.services.body_store import migrate_inline_bodies, get_body_store_stats
+from src.services.log_writer import start_email_log_writer, stop_email_log_writer
+from src.services.email_retry import start_email_retry_scheduler
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
@@ -19,12 +37,92 @@ CORS(app)
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(email_service_bp, url_prefix='/api')
 
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+# SQLite in WAL mode with tuned pragmas, see src/models/database.py
+configure_database(app)
 with app.app_context():
     db.create_all()
+    try:
+        ensure_schema()
+    except MissingUniqueIndex as e:
+        # The server must not run without the index, but the flask CLI has to load the app to
+        # run the command that repairs the data
+        if click.get_current_context(silent=True) is None:
+            raise
+        print(e)
+    # Queue the first batched/daily admin digest unless one is already waiting
+    schedule_admin_digest()
+
+# Compile the email templates once, before the first webhook needs them
+preload_email_templates()
+
+job_workers = None
+email_log_writer = None
+email_retry_scheduler = None
+
+def start_background_services():
+    """
+    Start this process's background threads. Importing the app doesn't start them, so CLI commands
+    such as migrate-email-bodies never process jobs or send emails; the dev server below starts them
+    and gunicorn starts them in each worker after fork, since threads don't survive fork()
+    (see gunicorn.conf.py).
+    """
+    global job_workers, email_log_writer, email_retry_scheduler
+    # Background workers that send queued order emails
+    job_workers = start_job_workers(app)
+    # Optional single writer that group-commits email logs (EMAIL_LOG_GROUP_COMMIT)
+    email_log_writer = start_email_log_writer(app)
+    # Resends failed emails with exponential backoff (EMAIL_RETRY_ENABLED)
+    email_retry_scheduler = start_email_retry_scheduler(app)
+
+def stop_background_services(timeout=None):
+    """
+    Let running jobs finish, then send the emails and commit the email logs still queued, all
+    within timeout seconds. gunicorn calls this when a worker exits, e.g. when it is recycled.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    def remaining():
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    # Stop taking work first; what is in flight still needs the dispatchers and the log writer
+    if job_workers is not None:
+        job_workers.stop(remaining())
+    if email_retry_scheduler is not None:
+        email_retry_scheduler.stop(remaining())
+    profile_resolver.stop(remaining())
+    email_dispatcher.stop(remaining())
+    stop_email_log_writer(remaining())
+
+@app.cli.command('migrate-email-bodies')
+@click.option('--batch-size', default=500, help='Rows per committed batch')
+@click.option('--vacuum', is_flag=True, help='VACUUM SQLite afterwards to return the freed space to the filesystem')
+def migrate_email_bodies(batch_size, vacuum):
+    """
+    Move email HTML stored inline on email_logs into the compressed body store
+    """
+    migrated = migrate_inline_bodies(batch_size)
+    print(f"Migrated {migrated} email logs")
+
+    if vacuum and db.engine.dialect.name == 'sqlite':
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.exec_driver_sql('VACUUM')
+
+    print(json.dumps(get_body_store_stats(), indent=2))
+
+@app.cli.command('dedupe-email-logs')
+@click.option('--dry-run', is_flag=True, help='Only count the duplicate email logs')
+def dedupe_email_logs_command(dry_run):
+    """
+    Delete duplicate email logs, keeping the earliest sent one per order and email type, then
+    create the unique (order_id, email_type) index they blocked
+    """
+    removed = dedupe_email_logs(dry_run=dry_run)
+    if dry_run:
+        print(f"{removed} duplicate email logs would be removed")
+        return
+
+    print(f"Removed {removed} duplicate email logs")
+    ensure_indexes()
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -44,6 +142,9 @@ def serve(path):
 
 
 if __name__ == '__main__':
+    if os.getenv('START_BACKGROUND_SERVICES', 'true').lower() in ('1', 'true', 'yes'):
+        start_background_services()
+
     # Railway provides PORT environment variable
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
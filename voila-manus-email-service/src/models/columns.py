@@ -0,0 +1,13 @@
+from src.models.user import db
+
+def truncate_to_column(*names):
+    """
+    Validator that trims the named string attributes to their column's length. Titles and other
+    fields scraped from listings can be longer than the column; SQLite stores them anyway but
+    Postgres rejects the row, so they are trimmed to fit on both.
+    """
+    @db.validates(*names)
+    def validate(self, key, value):
+        length = self.__table__.c[key].type.length
+        return value[:length] if value and length else value
+    return validate
@@ -0,0 +1,13 @@
+from datetime import datetime
+from src.models.user import db
+
+class CustomerCacheInvalidation(db.Model):
+    """
+    When a customer's cached identity was last invalidated. Every worker polls this table and
+    drops the customers invalidated since its last poll, so DELETE /customers/<id>/cache reaches
+    the workers and replicas that didn't receive the request.
+    """
+    __tablename__ = 'customer_cache_invalidations'
+
+    user_id = db.Column(db.String(100), primary_key=True)
+    invalidated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,111 @@
+import os
+from sqlalchemy import event
+from src.models.user import db
+
+# Configuration
+DATABASE_PATH = os.getenv('DATABASE_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'app.db'))
+# Railway and Heroku set DATABASE_URL when a Postgres service is attached; SQLALCHEMY_DATABASE_URI wins if both are set
+DATABASE_URL = os.getenv('SQLALCHEMY_DATABASE_URI') or os.getenv('DATABASE_URL') or f"sqlite:///{DATABASE_PATH}"
+
+# Pool settings per process; several web replicas share the server's max_connections
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL').upper()
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '20000'))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', '0'))
+
+SQLITE_PRAGMAS = {
+    # Readers no longer block the writer, and a commit appends to the WAL instead of rewriting pages
+    'journal_mode': SQLITE_JOURNAL_MODE,
+    # With WAL, NORMAL only syncs at checkpoints; a power loss can drop the last commits but not corrupt the file
+    'synchronous': SQLITE_SYNCHRONOUS,
+    # Wait for a competing writer instead of failing with "database is locked"
+    'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+    # Negative cache_size is in KiB rather than pages
+    'cache_size': -SQLITE_CACHE_SIZE_KB,
+    'temp_store': 'MEMORY',
+    'mmap_size': SQLITE_MMAP_SIZE
+}
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Apply SQLITE_PRAGMAS to every new SQLite connection
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+def normalize_database_url(url):
+    """
+    Accept the postgres:// scheme hosting providers hand out, which SQLAlchemy 2 no longer does
+    """
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def engine_options(url):
+    """
+    Engine options for the backend in url. SQLite keeps SQLAlchemy's per-file defaults;
+    server databases get a bounded pool that survives dropped and recycled connections.
+    """
+    if url.startswith('sqlite'):
+        return {'pool_pre_ping': DB_POOL_PRE_PING}
+
+    options = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING
+    }
+    if url.startswith('postgresql'):
+        options['connect_args'] = {'connect_timeout': DB_CONNECT_TIMEOUT, 'application_name': 'voila-email-service'}
+    return options
+
+def configure_database(app):
+    """
+    Point the app at its database (SQLite by default, or DATABASE_URL) and configure the
+    connection pool; SQLite connections are also tuned as they are opened
+    """
+    url = normalize_database_url(app.config.get('SQLALCHEMY_DATABASE_URI') or DATABASE_URL)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(url))
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', set_sqlite_pragmas)
+
+def get_pool_stats():
+    pool = db.engine.pool
+    stats = {}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[f'pool_{name}'] = method()
+    return stats
+
+def get_database_stats():
+    """
+    Connection pool usage and, for SQLite, the settings it is actually running with
+    """
+    stats = {'dialect': db.engine.dialect.name}
+    stats.update(get_pool_stats())
+    if db.engine.dialect.name != 'sqlite':
+        return stats
+
+    with db.engine.connect() as connection:
+        for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'page_count', 'freelist_count'):
+            stats[name] = connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+    return stats
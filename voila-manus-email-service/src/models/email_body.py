@@ -0,0 +1,67 @@
+import os
+import zlib
+from datetime import datetime
+from src.models.user import db
+
+# Use zstd when the zstandard package is installed; zlib is always available
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EMAIL_BODY_CODEC = os.getenv('EMAIL_BODY_CODEC', 'zstd' if zstandard else 'zlib')
+EMAIL_BODY_LEVEL = int(os.getenv('EMAIL_BODY_LEVEL', '19' if EMAIL_BODY_CODEC == 'zstd' else '9'))
+
+def compress_body(html, codec=EMAIL_BODY_CODEC, dictionary=None):
+    """
+    Compress html, priming the compressor with dictionary (raw bytes of a similar body) if given
+    """
+    data = html.encode('utf-8')
+    if codec == 'zstd':
+        zstd_dict = zstandard.ZstdCompressionDict(dictionary, dict_type=zstandard.DICT_TYPE_RAWCONTENT) if dictionary else None
+        return zstandard.ZstdCompressor(level=EMAIL_BODY_LEVEL, dict_data=zstd_dict).compress(data)
+
+    compressor = zlib.compressobj(EMAIL_BODY_LEVEL, zdict=dictionary) if dictionary else zlib.compressobj(EMAIL_BODY_LEVEL)
+    return compressor.compress(data) + compressor.flush()
+
+def decompress_body(data, codec, dictionary=None):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('Email body was stored with zstd but the zstandard package is not installed')
+        zstd_dict = zstandard.ZstdCompressionDict(dictionary, dict_type=zstandard.DICT_TYPE_RAWCONTENT) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=zstd_dict).decompress(data).decode('utf-8')
+
+    decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
+
+class EmailBodyDictionary(db.Model):
+    """
+    A reference body per email type. Bodies rendered from the same template differ only in a few
+    personalised fields, so compressing against it stores little more than those fields.
+    """
+    __tablename__ = 'email_body_dictionaries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False, index=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class EmailBody(db.Model):
+    """
+    Rendered email HTML, compressed and stored once per distinct body (keyed by SHA-256)
+    """
+    __tablename__ = 'email_bodies'
+
+    hash = db.Column(db.String(64), primary_key=True)
+    codec = db.Column(db.String(10), nullable=False)
+    dictionary_id = db.Column(db.Integer, db.ForeignKey('email_body_dictionaries.id'), nullable=True)
+    body = db.Column(db.LargeBinary, nullable=False)
+    raw_size = db.Column(db.Integer, nullable=False)
+    stored_size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    dictionary = db.relationship(EmailBodyDictionary, lazy='select')
+
+    @property
+    def html(self):
+        return decompress_body(self.body, self.codec, self.dictionary.data if self.dictionary else None)
@@ -1,10 +1,23 @@
-from flask_sqlalchemy import SQLAlchemy
+import json
 from datetime import datetime
-
-db = SQLAlchemy()
+from src.models.user import db
+from src.models.columns import truncate_to_column
+from src.models.email_body import EmailBody
 
 class EmailLog(db.Model):
     __tablename__ = 'email_logs'
+    __table_args__ = (
+        # Newest-first listings, optionally filtered, paged by (created_at, id)
+        db.Index('ix_email_logs_created_at_id', 'created_at', 'id'),
+        db.Index('ix_email_logs_order_id_created_at_id', 'order_id', 'created_at', 'id'),
+        db.Index('ix_email_logs_customer_email_created_at_id', 'customer_email', 'created_at', 'id'),
+        db.Index('ix_email_logs_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_email_logs_email_type_created_at_id', 'email_type', 'created_at', 'id'),
+        # Failed sends due for another attempt, for the retry scheduler
+        db.Index('ix_email_logs_status_next_attempt_at', 'status', 'next_attempt_at'),
+        # At most one email of each type per order, whatever the webhook or job retries do
+        db.Index('uq_email_logs_order_id_email_type', 'order_id', 'email_type', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.String(100), nullable=False)
@@ -12,28 +25,54 @@ class EmailLog(db.Model):
     customer_name = db.Column(db.String(255), nullable=False)
     property_title = db.Column(db.String(500), nullable=False)
     email_subject = db.Column(db.String(500), nullable=False)
-    email_content = db.Column(db.Text, nullable=False)
+    # Rows written before the body store keep their HTML inline; newer rows leave it empty
+    # and reference a compressed, deduplicated EmailBody instead
+    email_content = db.deferred(db.Column(db.Text, nullable=False, default=''))
+    body_hash = db.Column(db.String(64), db.ForeignKey('email_bodies.hash'), nullable=True, index=True)
     email_type = db.Column(db.String(50), nullable=False, default='order_confirmation')
     status = db.Column(db.String(50), nullable=False, default='pending')
     resend_message_id = db.Column(db.String(100), nullable=True)
     sent_at = db.Column(db.DateTime, nullable=True)
+    # Send attempts so far, when the next one is due (None once sent or given up) and a JSON list
+    # of every attempt's time and outcome
+    attempts = db.Column(db.Integer, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    attempt_history = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'order_id': self.order_id,
-            'customer_email': self.customer_email,
-            'customer_name': self.customer_name,
-            'property_title': self.property_title,
-            'email_subject': self.email_subject,
-            'email_content': self.email_content,
-            'email_type': self.email_type,
-            'status': self.status,
-            'resend_message_id': self.resend_message_id,
-            'sent_at': self.sent_at.isoformat() if self.sent_at else None,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
+    body = db.relationship(EmailBody, lazy='select')
+    
+    FIELDS = (
+        'id', 'order_id', 'customer_email', 'customer_name', 'property_title', 'email_subject',
+        'email_content', 'email_type', 'status', 'resend_message_id', 'sent_at', 'attempts', 'next_attempt_at',
+        'last_error', 'attempt_history', 'created_at', 'updated_at'
+    )
+    SUMMARY_FIELDS = tuple(field for field in FIELDS if field not in ('email_content', 'attempt_history'))
+    # Columns to load for a field, where they differ from the field name
+    FIELD_COLUMNS = {'email_content': ('email_content', 'body_hash')}
+    
+    validate_lengths = truncate_to_column('customer_name', 'property_title', 'email_subject')
+    
+    @property
+    def html_content(self):
+        """
+        The rendered HTML, from the body store or, for rows not migrated yet, the inline column
+        """
+        if self.body_hash:
+            return self.body.html
+        return self.email_content
+    
+    def to_dict(self, fields=FIELDS):
+        data = {}
+        for field in fields:
+            if field == 'email_content':
+                value = self.html_content
+            elif field == 'attempt_history':
+                value = json.loads(self.attempt_history) if self.attempt_history else []
+            else:
+                value = getattr(self, field)
+            data[field] = value.isoformat() if isinstance(value, datetime) else value
+        return data
 
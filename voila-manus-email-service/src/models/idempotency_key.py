@@ -0,0 +1,23 @@
+import json
+from datetime import datetime
+from src.models.user import db
+
+class IdempotencyKey(db.Model):
+    """
+    One row per webhook delivery key, e.g. "new_order:<order id>". The primary key makes the
+    first delivery the only one processed; later ones get the stored response back.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    key = db.Column(db.String(200), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='in_flight')
+    status_code = db.Column(db.Integer, nullable=True)
+    response = db.Column(db.Text, nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Indexed for pruning old keys
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    @property
+    def response_data(self):
+        return json.loads(self.response) if self.response else None
@@ -0,0 +1,107 @@
+from sqlalchemy import case, delete, func, inspect, select, text
+from src.models.user import db
+from src.models.email_log import EmailLog
+
+def ensure_schema():
+    """
+    Bring tables created by older releases up to date with the models.
+    db.create_all() only creates missing tables, so new columns and indexes are added here.
+    """
+    return ensure_columns() + ensure_indexes()
+
+def ensure_columns():
+    """
+    Add nullable columns declared on the models that an existing table doesn't have yet
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable:
+                raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} to an existing table")
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            quote = db.engine.dialect.identifier_preparer.quote
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}'))
+            created.append(f"{table.name}.{column.name}")
+
+    if created:
+        print(f"Added columns: {', '.join(created)}")
+    return created
+
+class MissingUniqueIndex(RuntimeError):
+    """
+    A unique index couldn't be built because existing rows violate it
+    """
+
+def dedupe_email_logs(dry_run=False):
+    """
+    Keep one email log per (order_id, email_type) so the unique index can be built: the earliest
+    sent one, or the earliest at all if none was sent. Returns the number of rows deleted, or
+    with dry_run the number that would be. Run through the dedupe-email-logs command, never at startup.
+    """
+    duplicated = (
+        select(EmailLog.order_id, EmailLog.email_type)
+        .group_by(EmailLog.order_id, EmailLog.email_type)
+        .having(func.count(EmailLog.id) > 1)
+    )
+    not_sent = case((EmailLog.status == 'sent', 0), else_=1)
+    removed = 0
+
+    with db.engine.begin() as connection:
+        for order_id, email_type in connection.execute(duplicated).all():
+            ids = connection.execute(
+                select(EmailLog.id)
+                .where(EmailLog.order_id == order_id, EmailLog.email_type == email_type)
+                .order_by(not_sent, EmailLog.created_at, EmailLog.id)
+            ).scalars().all()
+            if not dry_run:
+                connection.execute(delete(EmailLog).where(EmailLog.id.in_(ids[1:])))
+            removed += len(ids) - 1
+
+    return removed
+
+# The CLI command that removes the rows a unique index rejects, named when the index can't be built
+UNIQUE_INDEX_REPAIRS = {
+    'uq_email_logs_order_id_email_type': 'dedupe-email-logs'
+}
+
+def ensure_indexes():
+    """
+    Create indexes declared on the models that an existing database doesn't have yet.
+    A unique index that can't be built raises MissingUniqueIndex, since the guarantee it gives is missing.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            try:
+                index.create(db.engine)
+                created.append(index.name)
+            except Exception as e:
+                if index.unique:
+                    message = f"Could not create unique index {index.name}: {e}"
+                    if index.name in UNIQUE_INDEX_REPAIRS:
+                        message += (f"\nReview and remove the rows it rejects with "
+                                    f"`flask --app src.main {UNIQUE_INDEX_REPAIRS[index.name]}`, then restart")
+                    raise MissingUniqueIndex(message) from e
+                # A missing lookup index only costs speed; the app still runs without it
+                print(f"Could not create index {index.name}: {e}")
+
+    if created:
+        print(f"Created indexes: {', '.join(created)}")
+    return created
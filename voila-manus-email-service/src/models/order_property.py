@@ -0,0 +1,22 @@
+import json
+from datetime import datetime
+from src.models.user import db
+
+class OrderProperty(db.Model):
+    """
+    The property information extracted for an order when it was placed, so later emails for the
+    order read it by primary key instead of scraping a listing that may have been taken down
+    """
+    __tablename__ = 'order_properties'
+
+    order_id = db.Column(db.String(100), primary_key=True)
+    property_url = db.Column(db.Text, nullable=False)
+    property_info = db.Column(db.Text, nullable=False)
+    extraction_strategy = db.Column(db.String(50), nullable=True)
+    refreshed_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def property_info_data(self):
+        return json.loads(self.property_info)
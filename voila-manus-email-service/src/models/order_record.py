@@ -0,0 +1,52 @@
+import json
+from datetime import datetime
+from src.models.user import db
+from src.models.columns import truncate_to_column
+
+class OrderRecord(db.Model):
+    __tablename__ = 'order_records'
+    __table_args__ = (
+        # Pending admin notifications in arrival order, for the digest query
+        db.Index('ix_order_records_admin_notified_at_created_at', 'admin_notified_at', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.String(100), nullable=False, unique=True)
+    customer_name = db.Column(db.String(200), nullable=False)
+    customer_email = db.Column(db.String(255), nullable=False)
+    property_title = db.Column(db.String(500), nullable=False)
+    property_url = db.Column(db.Text, nullable=False)
+    property_type = db.Column(db.String(50), nullable=True)
+    location = db.Column(db.String(500), nullable=True)
+    price = db.Column(db.String(100), nullable=True)
+    features = db.Column(db.Text, nullable=True)
+    music_type = db.Column(db.String(100), nullable=True)
+    voiceover = db.Column(db.Boolean, nullable=False, default=False)
+    branding_asset = db.Column(db.String(500), nullable=True)
+    order_status = db.Column(db.String(50), nullable=True)
+    order_created_at = db.Column(db.String(50), nullable=True)
+    admin_notified_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    validate_lengths = truncate_to_column('customer_name', 'property_title', 'location', 'price', 'music_type', 'branding_asset')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'customer_name': self.customer_name,
+            'customer_email': self.customer_email,
+            'property_title': self.property_title,
+            'property_url': self.property_url,
+            'property_type': self.property_type,
+            'location': self.location,
+            'price': self.price,
+            'features': json.loads(self.features) if self.features else [],
+            'music_type': self.music_type,
+            'voiceover': self.voiceover,
+            'branding_asset': self.branding_asset,
+            'order_status': self.order_status,
+            'order_created_at': self.order_created_at,
+            'admin_notified_at': self.admin_notified_at.isoformat() if self.admin_notified_at else None,
+            'created_at': self.created_at.isoformat()
+        }
@@ -0,0 +1,13 @@
+from datetime import datetime
+from src.models.user import db
+
+class PropertyCacheEntry(db.Model):
+    __tablename__ = 'property_cache'
+
+    url_hash = db.Column(db.String(64), primary_key=True)
+    url = db.Column(db.Text, nullable=False)
+    property_info = db.Column(db.Text, nullable=False)
+    etag = db.Column(db.String(255), nullable=True)
+    last_modified = db.Column(db.String(100), nullable=True)
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,124 @@
+import os
+import json
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from src.models.order_record import OrderRecord, db
+from src.models.job import Job
+from src.models.idempotency_key import IdempotencyKey
+from src.services.job_queue import enqueue_job
+
+# Configuration
+ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', 'contact@voilaapp.ai')
+# immediate: one email per order, batched: every ADMIN_BATCH_INTERVAL_MINUTES, digest: daily at ADMIN_DIGEST_HOUR (UTC)
+ADMIN_NOTIFICATION_MODE = os.getenv('ADMIN_NOTIFICATION_MODE', 'immediate').lower()
+ADMIN_BATCH_INTERVAL_MINUTES = int(os.getenv('ADMIN_BATCH_INTERVAL_MINUTES', '15'))
+ADMIN_DIGEST_HOUR = int(os.getenv('ADMIN_DIGEST_HOUR', '8'))
+ADMIN_DIGEST_MAX_ORDERS = int(os.getenv('ADMIN_DIGEST_MAX_ORDERS', '500'))
+
+if ADMIN_NOTIFICATION_MODE not in ('immediate', 'batched', 'digest'):
+    print(f"Unknown ADMIN_NOTIFICATION_MODE '{ADMIN_NOTIFICATION_MODE}', using immediate")
+    ADMIN_NOTIFICATION_MODE = 'immediate'
+
+DIGEST_JOB_TYPE = 'admin_digest'
+NOTIFICATION_JOB_TYPE = 'admin_notification'
+
+def record_order(order_id, customer_data, property_info, order_details, record, admin_notified=False):
+    """
+    Store the order summary the admin digest is built from. Adds to the session without committing.
+    """
+    order = OrderRecord.query.filter_by(order_id=order_id).first() or OrderRecord(order_id=order_id)
+
+    order.customer_name = customer_data['name']
+    order.customer_email = customer_data['email']
+    order.property_title = property_info['title']
+    order.property_url = order_details.get('property_url', '')
+    order.property_type = property_info.get('type', 'residential_home')
+    order.location = property_info.get('location', '')
+    order.price = property_info.get('price', '')
+    order.features = json.dumps(property_info.get('features', []))
+    order.music_type = order_details.get('music_type')
+    order.voiceover = bool(order_details.get('voiceover', False))
+    order.branding_asset = order_details.get('branding_asset')
+    order.order_status = record.get('order_status', 'pending')
+    order.order_created_at = record.get('created_at')
+    if admin_notified:
+        order.admin_notified_at = datetime.utcnow()
+
+    db.session.add(order)
+    return order
+
+def pending_admin_orders(limit=ADMIN_DIGEST_MAX_ORDERS):
+    """
+    Orders the admin hasn't been told about yet, oldest first, in a single indexed query
+    """
+    return (
+        OrderRecord.query
+        .filter(OrderRecord.admin_notified_at.is_(None))
+        .order_by(OrderRecord.created_at, OrderRecord.id)
+        .limit(limit)
+        .all()
+    )
+
+def mark_order_admin_notified(order_id):
+    """
+    Record that the immediate admin notification for an order went out
+    """
+    OrderRecord.query.filter_by(order_id=order_id).update(
+        {OrderRecord.admin_notified_at: datetime.utcnow()}, synchronize_session=False
+    )
+    db.session.commit()
+
+def mark_admin_notified(order_ids):
+    if not order_ids:
+        return 0
+    updated = (
+        OrderRecord.query
+        .filter(OrderRecord.id.in_(order_ids))
+        .update({OrderRecord.admin_notified_at: datetime.utcnow()}, synchronize_session=False)
+    )
+    db.session.commit()
+    return updated
+
+def next_admin_notification_time(now=None):
+    """
+    When the next batched or daily digest is due
+    """
+    now = now or datetime.utcnow()
+
+    if ADMIN_NOTIFICATION_MODE == 'batched':
+        interval = max(1, ADMIN_BATCH_INTERVAL_MINUTES)
+        minutes = (now.hour * 60 + now.minute) // interval * interval + interval
+        return now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(minutes=minutes)
+
+    due = now.replace(hour=ADMIN_DIGEST_HOUR, minute=0, second=0, microsecond=0)
+    return due if due > now else due + timedelta(days=1)
+
+def schedule_admin_digest():
+    """
+    Make sure one digest job is queued for the next due time. Does nothing in immediate mode.
+    Safe to call from every worker and replica: the job is inserted together with a
+    "admin_digest:<due time>" idempotency key, so only the first caller for a due time queues it.
+    """
+    if ADMIN_NOTIFICATION_MODE == 'immediate':
+        return None
+
+    queued = Job.query.filter_by(job_type=DIGEST_JOB_TYPE, status='queued').first()
+    if queued is not None:
+        return queued
+
+    run_after = next_admin_notification_time()
+    db.session.add(IdempotencyKey(key=f'{DIGEST_JOB_TYPE}:{run_after.isoformat()}', status='done'))
+    try:
+        # Commits the key and the job together
+        return enqueue_job(DIGEST_JOB_TYPE, {'mode': ADMIN_NOTIFICATION_MODE}, run_after=run_after)
+    except IntegrityError:
+        db.session.rollback()
+        return Job.query.filter_by(job_type=DIGEST_JOB_TYPE, status='queued').first()
+
+def get_admin_notification_stats():
+    scheduled = Job.query.filter_by(job_type=DIGEST_JOB_TYPE, status='queued').first()
+    return {
+        'mode': ADMIN_NOTIFICATION_MODE,
+        'pending_orders': OrderRecord.query.filter(OrderRecord.admin_notified_at.is_(None)).count(),
+        'next_digest_at': scheduled.run_after.isoformat() if scheduled else None
+    }
@@ -0,0 +1,101 @@
+import queue
+import time
+import threading
+
+# Queued by stop() to make the collector process what is already queued and exit
+_STOP = object()
+
+class BatchCollector:
+    """
+    Base for a single collector thread that groups items queued by many threads into batches:
+    a batch is the first item plus whatever else arrives within `window_ms`, up to `max_size`.
+
+    Subclasses implement _process(batch), called on the collector thread, and may override
+    _new_batch() and _add(batch, item) to merge items; max_size counts len(batch).
+    """
+
+    thread_name = 'batch-collector'
+
+    def __init__(self, window_ms, max_size, stats):
+        self.window = window_ms / 1000.0
+        self.max_size = max_size
+        self._pending = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = dict(stats)
+
+    def _put(self, item):
+        self._ensure_started()
+        self._pending.put(item)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._collect, name=self.thread_name, daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        while True:
+            item = self._pending.get()
+            if item is _STOP:
+                return
+            batch = self._new_batch()
+            self._add(batch, item)
+            deadline = time.monotonic() + self.window
+
+            stopping = False
+            while len(batch) < self.max_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._pending.get(timeout=remaining) if remaining > 0 else self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                self._add(batch, item)
+
+            self._process(batch)
+            if stopping:
+                return
+
+    def _new_batch(self):
+        return []
+
+    def _add(self, batch, item):
+        batch.append(item)
+
+    def _process(self, batch):
+        raise NotImplementedError
+
+    def stop(self, timeout=None):
+        """
+        Process everything queued so far, then end the collector thread. An item queued
+        afterwards starts a new one.
+        """
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._pending.put(_STOP)
+        thread.join(timeout)
+
+    def _record(self, **counts):
+        """
+        Add to the counters; max_* counters keep the largest value seen instead
+        """
+        with self._stats_lock:
+            for name, value in counts.items():
+                if name.startswith('max_'):
+                    self._stats[name] = max(self._stats[name], value)
+                else:
+                    self._stats[name] += value
+
+    def _snapshot(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._pending.qsize()
+        return stats
@@ -0,0 +1,182 @@
+import os
+import hashlib
+import threading
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.email_body import EmailBody, EmailBodyDictionary, EMAIL_BODY_CODEC, compress_body, db
+from src.models.email_log import EmailLog
+
+# Configuration
+EMAIL_BODY_DICTIONARIES = os.getenv('EMAIL_BODY_DICTIONARIES', 'true').lower() in ('1', 'true', 'yes')
+
+# Dictionary bytes are immutable, so each process keeps the ones it has used
+_dictionaries = {}
+_dictionary_lock = threading.Lock()
+# session.info key for dictionaries created in the session's open transaction
+PENDING_DICTIONARIES = 'pending_email_body_dictionaries'
+
+def _insert_ignoring_duplicates(values):
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        statement = sqlite.insert(EmailBody).values(**values).on_conflict_do_nothing(index_elements=['hash'])
+    elif dialect == 'postgresql':
+        statement = postgresql.insert(EmailBody).values(**values).on_conflict_do_nothing(index_elements=['hash'])
+    else:
+        if db.session.get(EmailBody, values['hash']) is None:
+            db.session.add(EmailBody(**values))
+        return
+    db.session.execute(statement)
+
+def get_dictionary(kind, sample):
+    """
+    Return (id, bytes) of the compression dictionary for this kind of email,
+    making sample the dictionary when there is none yet
+    """
+    with _dictionary_lock:
+        if kind in _dictionaries:
+            return _dictionaries[kind]
+
+    # A dictionary this transaction created isn't cached until the transaction commits: if it
+    # rolls back, bodies compressed against the cached id could never be read again
+    pending = db.session.info.setdefault(PENDING_DICTIONARIES, {})
+    if kind in pending:
+        return pending[kind]
+
+    row = (
+        db.session.query(EmailBodyDictionary.id, EmailBodyDictionary.data)
+        .filter(EmailBodyDictionary.kind == kind)
+        .order_by(EmailBodyDictionary.id.desc())
+        .first()
+    )
+    if row is None:
+        dictionary = EmailBodyDictionary(kind=kind, data=sample)
+        db.session.add(dictionary)
+        db.session.flush()
+        pending[kind] = (dictionary.id, sample)
+        return pending[kind]
+
+    with _dictionary_lock:
+        _dictionaries[kind] = (row[0], bytes(row[1]))
+        return _dictionaries[kind]
+
+@event.listens_for(db.session, 'after_commit')
+def cache_committed_dictionaries(session):
+    pending = session.info.pop(PENDING_DICTIONARIES, None)
+    if pending:
+        with _dictionary_lock:
+            _dictionaries.update(pending)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def forget_rolled_back_dictionaries(session, previous_transaction):
+    session.info.pop(PENDING_DICTIONARIES, None)
+
+def store_email_body(html, kind=None):
+    """
+    Store html once, compressed, and return its hash for EmailLog.body_hash.
+    kind (the email type) selects the dictionary the body is compressed against.
+    Runs in the caller's transaction; identical bodies are only written the first time.
+    """
+    data = html.encode('utf-8')
+    body_hash = hashlib.sha256(data).hexdigest()
+
+    # Skip compressing bodies that are already stored
+    if db.session.query(EmailBody.hash).filter(EmailBody.hash == body_hash).first() is None:
+        dictionary_id, dictionary = None, None
+        if kind and EMAIL_BODY_DICTIONARIES:
+            dictionary_id, dictionary = get_dictionary(kind, data)
+
+        compressed = compress_body(html, dictionary=dictionary)
+        _insert_ignoring_duplicates({
+            'hash': body_hash,
+            'codec': EMAIL_BODY_CODEC,
+            'dictionary_id': dictionary_id,
+            'body': compressed,
+            'raw_size': len(data),
+            'stored_size': len(compressed)
+        })
+    return body_hash
+
+def load_email_content(log_id):
+    """
+    The HTML of one email log, reading only the columns needed. None if the log doesn't exist.
+    """
+    row = db.session.query(EmailLog.body_hash, EmailLog.email_content).filter(EmailLog.id == log_id).first()
+    if row is None:
+        return None
+    if row.body_hash:
+        return db.session.get(EmailBody, row.body_hash).html
+    return row.email_content
+
+def migrate_inline_bodies(batch_size=500, report=print):
+    """
+    Move HTML still stored inline on email_logs into the body store, one committed batch at a time.
+    Returns the number of rows migrated.
+    """
+    migrated = 0
+    last_id = 0
+
+    while True:
+        rows = (
+            db.session.query(EmailLog.id, EmailLog.email_type, EmailLog.email_content)
+            .filter(EmailLog.body_hash.is_(None), EmailLog.id > last_id)
+            .order_by(EmailLog.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+
+        for log_id, email_type, email_content in rows:
+            body_hash = store_email_body(email_content or '', email_type)
+            db.session.query(EmailLog).filter(EmailLog.id == log_id).update(
+                {EmailLog.body_hash: body_hash, EmailLog.email_content: ''}, synchronize_session=False
+            )
+        db.session.commit()
+
+        migrated += len(rows)
+        last_id = rows[-1].id
+        report(f"Migrated {migrated} email bodies")
+
+    return migrated
+
+def get_body_store_stats():
+    """
+    Space used by email bodies, and how much compression and deduplication saved
+    """
+    dictionaries, dictionary_bytes = db.session.query(
+        db.func.count(EmailBodyDictionary.id),
+        db.func.coalesce(db.func.sum(db.func.length(EmailBodyDictionary.data)), 0)
+    ).one()
+
+    bodies, raw_bytes, stored_bytes = db.session.query(
+        db.func.count(EmailBody.hash),
+        db.func.coalesce(db.func.sum(EmailBody.raw_size), 0),
+        db.func.coalesce(db.func.sum(EmailBody.stored_size), 0)
+    ).one()
+
+    stored_logs, logical_bytes = db.session.query(
+        db.func.count(EmailLog.id),
+        db.func.coalesce(db.func.sum(EmailBody.raw_size), 0)
+    ).join(EmailBody, EmailLog.body_hash == EmailBody.hash).one()
+
+    inline_logs, inline_bytes = db.session.query(
+        db.func.count(EmailLog.id),
+        db.func.coalesce(db.func.sum(db.func.length(EmailLog.email_content)), 0)
+    ).filter(EmailLog.body_hash.is_(None)).one()
+
+    stored_bytes = int(stored_bytes) + int(dictionary_bytes)
+
+    return {
+        'codec': EMAIL_BODY_CODEC,
+        'dictionaries': dictionaries,
+        'bodies': bodies,
+        'logs_in_store': stored_logs,
+        'logs_inline': inline_logs,
+        'inline_bytes': int(inline_bytes),
+        'logical_bytes': int(logical_bytes),
+        'unique_bytes': int(raw_bytes),
+        'stored_bytes': stored_bytes,
+        'bytes_saved': int(logical_bytes) - stored_bytes,
+        'dedup_ratio': round(logical_bytes / raw_bytes, 2) if raw_bytes else 0.0,
+        'compression_ratio': round(raw_bytes / stored_bytes, 2) if stored_bytes else 0.0
+    }
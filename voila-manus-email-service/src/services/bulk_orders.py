@@ -0,0 +1,162 @@
+import os
+import json
+from src.services.fanout import submit_to
+from src.services.metrics import Counters
+from src.services.property_cache import normalize_url
+from src.services.resilience import UpstreamUnavailable, with_latency_budget
+
+# Configuration
+BULK_ORDERS_MAX_RECORDS = int(os.getenv('BULK_ORDERS_MAX_RECORDS', '5000'))
+# Per-record budget for its lookups and sends, counted from when the record's work starts
+BULK_ORDER_LATENCY_BUDGET = float(os.getenv('BULK_ORDER_LATENCY_BUDGET', '30'))
+# How long a listing fetch may wait for its host's rate limit; longer than a webhook's, since
+# an upload often has many listings on one site
+BULK_LISTING_MAX_WAIT = float(os.getenv('BULK_LISTING_MAX_WAIT', '20'))
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json-seq')
+REQUIRED_ORDER_FIELDS = ('id', 'user_id', 'property_url')
+
+_stats = Counters('requests', 'records', 'invalid', 'duplicates', 'sent', 'failed',
+                  'customer_lookups', 'prefetched_customers', 'property_extractions')
+
+def parse_order_records(body, mimetype):
+    """
+    Split a bulk upload into entries of {'index', 'record'} or {'index', 'error'}. The body is
+    NDJSON (one order per line) or a JSON array; each item is an order record or a webhook
+    payload wrapping one in "record".
+    """
+    if mimetype in NDJSON_MIMETYPES:
+        items = []
+        for line in body.splitlines():
+            line = line.strip().lstrip('\x1e')
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(ValueError(f'Invalid JSON: {e}'))
+    else:
+        items = json.loads(body) if body.strip() else []
+        if isinstance(items, dict):
+            items = items.get('records')
+        if not isinstance(items, list):
+            raise ValueError('Expected a JSON array of order records or {"records": [...]}')
+
+    entries = []
+    for index, item in enumerate(items):
+        if isinstance(item, Exception):
+            entries.append({'index': index, 'error': str(item)})
+            continue
+        record = item.get('record', item) if isinstance(item, dict) else None
+        if not isinstance(record, dict):
+            entries.append({'index': index, 'error': 'Order record must be a JSON object'})
+            continue
+        missing = [field for field in REQUIRED_ORDER_FIELDS if not record.get(field)]
+        if missing:
+            entries.append({'index': index, 'error': f'Missing required field: {missing[0]}'})
+            continue
+        entries.append({'index': index, 'record': record})
+    return entries
+
+def _complete_order(record, customer_future, property_future, send_order):
+    customer_data = customer_future.result()
+    if not customer_data:
+        return {'success': False, 'error': 'Could not fetch customer data'}
+    property_info, extraction_strategy = property_future.result()
+    return send_order(record, customer_data, property_info, extraction_strategy)
+
+def stream_order_batch(entries, find_processed, prefetch_customers, fetch_customer, extract_property, send_order):
+    """
+    Process parsed bulk entries and yield one result dict per entry, in upload order, as each
+    completes, followed by a summary.
+
+    Orders already confirmed (find_processed(order_ids) maps order id to its result) or repeated
+    in the upload are skipped. Each distinct user is looked up and each distinct listing extracted
+    once for the whole upload, all on the bounded bulk pool, and each order is sent as soon as its
+    lookups are done. prefetch_customers(user_ids) may first resolve the upload's users in bulk;
+    fetch_customer(user_id), extract_property(url) and
+    send_order(record, customer_data, property_info, extraction_strategy) do the work.
+    """
+    _stats.add(requests=1, records=len(entries))
+    order_ids = {entry['record']['id'] for entry in entries if 'record' in entry}
+    processed = find_processed(order_ids)
+
+    # Only the first occurrence of an order that hasn't been confirmed yet is sent
+    first_index = {}
+    for entry in entries:
+        if 'record' in entry and entry['record']['id'] not in processed:
+            first_index.setdefault(entry['record']['id'], entry['index'])
+
+    budgeted = with_latency_budget(BULK_ORDER_LATENCY_BUDGET)
+    user_ids = list(dict.fromkeys(entry['record']['user_id'] for entry in entries
+                                  if 'record' in entry and first_index.get(entry['record']['id']) == entry['index']))
+    _stats.add(prefetched_customers=budgeted(prefetch_customers)(user_ids))
+
+    customers = {}
+    properties = {}
+    sends = {}
+    for entry in entries:
+        record = entry.get('record')
+        if record is None or first_index.get(record['id']) != entry['index']:
+            continue
+        if record['user_id'] not in customers:
+            customers[record['user_id']] = submit_to('bulk', budgeted(fetch_customer), record['user_id'])
+        property_key = normalize_url(record['property_url'])
+        if property_key not in properties:
+            properties[property_key] = submit_to('bulk', budgeted(extract_property), record['property_url'])
+        # Queued after the lookups it waits on, so it never holds a worker for a lookup that can't start
+        sends[entry['index']] = submit_to(
+            'bulk', budgeted(_complete_order), record, customers[record['user_id']], properties[property_key], send_order
+        )
+    _stats.add(customer_lookups=len(customers), property_extractions=len(properties))
+    futures = [(entry, sends.get(entry['index'])) for entry in entries]
+
+    summary = {'records': len(entries), 'sent': 0, 'duplicates': 0, 'failed': 0, 'invalid': 0,
+               'customer_lookups': len(customers), 'property_extractions': len(properties)}
+    try:
+        for entry, future in futures:
+            result = _entry_result(entry, future, processed)
+            outcome = (
+                'invalid' if 'record' not in entry
+                else 'duplicates' if result.get('duplicate')
+                else 'sent' if result.get('success')
+                else 'failed'
+            )
+            summary[outcome] += 1
+            _stats.add(**{outcome: 1})
+            yield result
+    finally:
+        # The client went away: don't start orders nobody is waiting for
+        for _, future in futures:
+            if future is not None:
+                future.cancel()
+
+    yield {'summary': summary}
+
+def _entry_result(entry, future, processed):
+    result = {'index': entry['index']}
+    record = entry.get('record')
+    if record is None:
+        result.update(success=False, error=entry['error'])
+        return result
+
+    result['order_id'] = record['id']
+    if future is None:
+        # Confirmed before this upload, or repeated within it
+        result.update(processed.get(record['id']) or {
+            'success': True, 'duplicate': True, 'message': 'Order appears more than once in this upload'
+        })
+        return result
+
+    try:
+        result.update(future.result())
+    except UpstreamUnavailable as e:
+        result.update(success=False, error=str(e), retry_after=e.retry_after)
+    except Exception as e:
+        result.update(success=False, error=str(e))
+    return result
+
+def get_bulk_order_stats():
+    stats = _stats.snapshot()
+    stats['max_records'] = BULK_ORDERS_MAX_RECORDS
+    return stats
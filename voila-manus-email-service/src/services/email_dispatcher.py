@@ -0,0 +1,127 @@
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from src.services.batching import BatchCollector
+from src.services.resilience import UpstreamUnavailable, current_deadline, deadline_at
+
+# Configuration
+EMAIL_BATCHING = os.getenv('EMAIL_BATCHING', 'true').lower() in ('1', 'true', 'yes')
+EMAIL_BATCH_WINDOW_MS = int(os.getenv('EMAIL_BATCH_WINDOW_MS', '100'))
+EMAIL_BATCH_MAX_SIZE = min(int(os.getenv('EMAIL_BATCH_MAX_SIZE', '100')), 100)  # Resend accepts at most 100 per batch
+EMAIL_BATCH_SENDERS = int(os.getenv('EMAIL_BATCH_SENDERS', '2'))
+
+class EmailDispatcher(BatchCollector):
+    """
+    Coalesce outbound emails arriving within a short window into one batch request.
+
+    send_one(payload) sends a single email and returns the result dict. send_batch(payloads)
+    sends several and returns one entry per payload: a result dict, or None for a message the
+    provider rejected, which is then retried on its own. If the whole batch request fails,
+    every message falls back to a single send.
+
+    Each message keeps its caller's latency budget: messages whose budget ran out while queued
+    fail without being sent, and a batch request gets the earliest deadline among its messages.
+    """
+
+    thread_name = 'email-dispatcher'
+
+    def __init__(self, send_one, send_batch, window_ms=EMAIL_BATCH_WINDOW_MS, max_size=EMAIL_BATCH_MAX_SIZE,
+                 senders=EMAIL_BATCH_SENDERS):
+        super().__init__(window_ms, max_size, {'messages': 0, 'batches': 0, 'batched_messages': 0, 'single_sends': 0,
+                                               'fallback_sends': 0, 'expired': 0, 'unavailable': 0})
+        self.send_one = send_one
+        self.send_batch = send_batch
+        self._executor = ThreadPoolExecutor(max_workers=senders, thread_name_prefix='email-dispatch')
+
+    def send(self, payload):
+        """
+        Queue a message and return a Future for its result dict
+        """
+        future = Future()
+        self._put((payload, future, current_deadline()))
+        return future
+
+    def _process(self, batch):
+        self._executor.submit(self._dispatch, batch)
+
+    def stop(self, timeout=None):
+        """
+        Send everything queued so far and wait for the sends to finish
+        """
+        super().stop(timeout)
+        self._executor.shutdown(wait=True)
+
+    def _dispatch(self, batch):
+        try:
+            batch = self._drop_expired(batch)
+            if not batch:
+                return
+
+            if len(batch) == 1:
+                self._record(messages=1, single_sends=1)
+                self._send_single(*batch[0])
+                return
+
+            self._record(messages=len(batch), batches=1, batched_messages=len(batch))
+            deadlines = [deadline for _, _, deadline in batch if deadline is not None]
+            try:
+                with deadline_at(min(deadlines) if deadlines else None):
+                    results = self.send_batch([payload for payload, _, _ in batch])
+            except UpstreamUnavailable as e:
+                # Single sends would hit the same open breaker or spent budget; leave them to the retries
+                self._record(unavailable=len(batch))
+                results = [unavailable_result(e)] * len(batch)
+            except Exception as e:
+                print(f"Batch send of {len(batch)} emails failed, sending individually: {e}")
+                results = [None] * len(batch)
+
+            for (payload, future, deadline), result in zip(batch, results):
+                if result is None:
+                    self._record(fallback_sends=1)
+                    self._send_single(payload, future, deadline)
+                else:
+                    future.set_result(result)
+
+            for _, future, _ in batch[len(results):]:
+                future.set_result({'success': False, 'error': 'No result for message in batch response'})
+
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _drop_expired(self, batch):
+        now = time.monotonic()
+        live = []
+        for payload, future, deadline in batch:
+            if deadline is not None and deadline <= now:
+                self._record(expired=1)
+                future.set_result({'success': False, 'error': 'Latency budget exhausted before sending'})
+            else:
+                live.append((payload, future, deadline))
+        return live
+
+    def _send_single(self, payload, future, deadline):
+        try:
+            with deadline_at(deadline):
+                future.set_result(self.send_one(payload))
+        except Exception as e:
+            future.set_exception(e)
+
+    def stats(self):
+        stats = self._snapshot()
+        stats['enabled'] = EMAIL_BATCHING
+        stats['window_ms'] = int(self.window * 1000)
+        stats['max_batch_size'] = self.max_size
+        return stats
+
+def unavailable_result(error):
+    """
+    Result dict for an email that wasn't sent because the provider is unavailable to us right now
+    """
+    return {
+        'success': False,
+        'error': str(error),
+        'status_code': None,
+        'retry_after': error.retry_after
+    }
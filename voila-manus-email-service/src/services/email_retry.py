@@ -0,0 +1,246 @@
+import os
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from sqlalchemy import update
+from sqlalchemy.orm import load_only
+from src.models.email_log import EmailLog, db
+from src.services.fanout import submit_to
+from src.services.metrics import Counters
+
+# Configuration
+EMAIL_RETRY_ENABLED = os.getenv('EMAIL_RETRY_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+EMAIL_RETRY_MAX_ATTEMPTS = int(os.getenv('EMAIL_RETRY_MAX_ATTEMPTS', '5'))  # including the first send
+EMAIL_RETRY_BASE_DELAY = float(os.getenv('EMAIL_RETRY_BASE_DELAY', '60'))
+EMAIL_RETRY_MAX_DELAY = float(os.getenv('EMAIL_RETRY_MAX_DELAY', '3600'))
+EMAIL_RETRY_POLL_INTERVAL = float(os.getenv('EMAIL_RETRY_POLL_INTERVAL', '15'))
+EMAIL_RETRY_BATCH_SIZE = int(os.getenv('EMAIL_RETRY_BATCH_SIZE', '50'))
+# How long a scheduler owns the rows it picked up before another process may retry them
+EMAIL_RETRY_LEASE_SECONDS = int(os.getenv('EMAIL_RETRY_LEASE_SECONDS', '300'))
+
+RETRY_STATUSES = ('failed', 'pending')
+
+_sender = None
+_stats = Counters('sweeps', 'attempts', 'recovered', 'rescheduled', 'gave_up', 'rate_limited')
+
+def register_retry_sender(sender):
+    """
+    Set the function used to resend emails, called as sender(to_email, subject, html_content, customer_name,
+    idempotency_key=...) and returning a result dict like send_email_via_resend. It must send each email
+    in its own request: a batch request would carry a different key than the first attempt did.
+    """
+    global _sender
+    _sender = sender
+
+def email_idempotency_key(order_id, email_type):
+    """
+    Resend Idempotency-Key for one email of an order, the same on every attempt to send it
+    """
+    return f"{order_id}:{email_type}"
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header, given either as seconds or as an HTTP date
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempts, retry_after=None):
+    """
+    Exponential backoff with jitter after the given number of attempts, never sooner than
+    the provider's Retry-After
+    """
+    delay = min(EMAIL_RETRY_MAX_DELAY, EMAIL_RETRY_BASE_DELAY * (2 ** (attempts - 1)))
+    # Jitter over the upper half keeps a burst of failures from retrying in lockstep
+    delay = random.uniform(delay / 2, delay)
+    return max(delay, retry_after or 0.0)
+
+def is_retryable(result):
+    """
+    Network errors, 429 and 5xx are worth retrying; other 4xx responses will fail the same way again
+    """
+    status_code = result.get('status_code')
+    return status_code is None or status_code == 429 or status_code >= 500
+
+def apply_attempt(fields, result, attempts, history=None, now=None):
+    """
+    Fill in the EmailLog fields describing a send attempt: its outcome, the attempt history,
+    and when the next attempt is due if it failed and may be retried
+    """
+    now = now or datetime.utcnow()
+    history = list(history or [])
+    entry = {'attempt': attempts, 'at': now.isoformat(), 'success': bool(result.get('success'))}
+    if not result.get('success'):
+        entry['error'] = result.get('error')
+        entry['status_code'] = result.get('status_code')
+        if result.get('retry_after') is not None:
+            entry['retry_after'] = result['retry_after']
+    history.append(entry)
+
+    fields['attempts'] = attempts
+    fields['attempt_history'] = json.dumps(history)
+    fields['next_attempt_at'] = None
+
+    if result.get('success'):
+        fields['status'] = 'sent'
+        fields['resend_message_id'] = result.get('message_id')
+        fields['sent_at'] = now
+        fields['last_error'] = None
+        return fields
+
+    fields['status'] = 'failed'
+    fields['last_error'] = result.get('error')
+    if EMAIL_RETRY_ENABLED and attempts < EMAIL_RETRY_MAX_ATTEMPTS and is_retryable(result):
+        fields['next_attempt_at'] = now + timedelta(seconds=backoff_delay(attempts, result.get('retry_after')))
+    return fields
+
+def first_attempt_fields(result):
+    """
+    EmailLog fields for the send made when the email was first generated
+    """
+    return apply_attempt({}, result, 1)
+
+def claim_due_emails(limit=EMAIL_RETRY_BATCH_SIZE):
+    """
+    Pick up to limit failed or pending emails whose next attempt is due, oldest first, through the
+    (status, next_attempt_at) index. Each is leased by moving next_attempt_at forward, which
+    only succeeds for one scheduler when several processes sweep at once.
+    """
+    now = datetime.utcnow()
+    due = (
+        db.session.query(EmailLog.id, EmailLog.next_attempt_at)
+        .filter(EmailLog.status.in_(RETRY_STATUSES), EmailLog.next_attempt_at <= now)
+        .order_by(EmailLog.next_attempt_at)
+        .limit(limit)
+        .all()
+    )
+
+    claimed = []
+    lease_until = now + timedelta(seconds=EMAIL_RETRY_LEASE_SECONDS)
+    for log_id, next_attempt_at in due:
+        result = db.session.execute(
+            update(EmailLog)
+            .where(EmailLog.id == log_id, EmailLog.next_attempt_at == next_attempt_at)
+            .values(next_attempt_at=lease_until)
+        )
+        if result.rowcount == 1:
+            claimed.append(log_id)
+    db.session.commit()
+    return claimed
+
+def retry_due_emails(limit=EMAIL_RETRY_BATCH_SIZE):
+    """
+    Resend the stored body of every due email and record the outcome on its row.
+    Returns the number of emails attempted.
+    """
+    if _sender is None:
+        return 0
+
+    _stats.add(sweeps=1)
+    claimed = claim_due_emails(limit)
+    if not claimed:
+        return 0
+
+    email_logs = (
+        EmailLog.query
+        .options(load_only(EmailLog.id, EmailLog.order_id, EmailLog.email_type, EmailLog.customer_email,
+                           EmailLog.customer_name, EmailLog.email_subject, EmailLog.email_content,
+                           EmailLog.body_hash, EmailLog.attempts, EmailLog.attempt_history))
+        .filter(EmailLog.id.in_(claimed))
+        .all()
+    )
+
+    # Send concurrently, each in its own request under the key the first attempt used, so Resend
+    # drops the resend if a timed-out attempt was delivered
+    sends = [
+        (email_log, submit_to('resend', _sender, email_log.customer_email, email_log.email_subject,
+                              email_log.html_content, email_log.customer_name,
+                              idempotency_key=email_idempotency_key(email_log.order_id, email_log.email_type)))
+        for email_log in email_logs
+    ]
+
+    for email_log, future in sends:
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+
+        history = json.loads(email_log.attempt_history) if email_log.attempt_history else []
+        fields = apply_attempt({}, result, (email_log.attempts or 1) + 1, history)
+        for name, value in fields.items():
+            setattr(email_log, name, value)
+
+        _stats.add(
+            attempts=1,
+            recovered=1 if result.get('success') else 0,
+            rescheduled=1 if fields['next_attempt_at'] else 0,
+            gave_up=1 if not result.get('success') and not fields['next_attempt_at'] else 0,
+            rate_limited=1 if result.get('status_code') == 429 else 0
+        )
+
+    db.session.commit()
+    return len(sends)
+
+class EmailRetryScheduler:
+    """
+    Daemon thread that periodically resends failed emails whose backoff has expired
+    """
+
+    def __init__(self, app, interval=EMAIL_RETRY_POLL_INTERVAL):
+        self.app = app
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='email-retry', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    # Keep going while full batches come back, otherwise wait for the next sweep
+                    if retry_due_emails() >= EMAIL_RETRY_BATCH_SIZE:
+                        continue
+            except Exception as e:
+                print(f"Email retry scheduler error: {e}")
+
+            self._stopping.wait(self.interval)
+
+def start_email_retry_scheduler(app):
+    """
+    Start the retry scheduler for the given app unless EMAIL_RETRY_ENABLED is off
+    """
+    if not EMAIL_RETRY_ENABLED:
+        return None
+    scheduler = EmailRetryScheduler(app)
+    scheduler.start()
+    return scheduler
+
+def get_email_retry_stats():
+    stats = _stats.snapshot()
+    stats['enabled'] = EMAIL_RETRY_ENABLED
+    stats['max_attempts'] = EMAIL_RETRY_MAX_ATTEMPTS
+    stats['waiting'] = (
+        db.session.query(db.func.count(EmailLog.id))
+        .filter(EmailLog.status.in_(RETRY_STATUSES), EmailLog.next_attempt_at.isnot(None))
+        .scalar()
+    )
+    return stats
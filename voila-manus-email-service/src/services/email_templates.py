@@ -0,0 +1,44 @@
+import os
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+
+# Configuration
+EMAIL_TEMPLATE_DIR = os.getenv('EMAIL_TEMPLATE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates'))
+EMAIL_TEMPLATE_BYTECODE_DIR = os.getenv('EMAIL_TEMPLATE_BYTECODE_DIR', '')
+EMAIL_TEMPLATE_AUTO_RELOAD = os.getenv('EMAIL_TEMPLATE_AUTO_RELOAD', 'false').lower() in ('1', 'true', 'yes')
+
+def _create_environment():
+    """
+    Build the shared environment. Compiled templates stay in the environment's cache for
+    the life of the process; a bytecode directory also lets new workers skip compilation.
+    """
+    bytecode_cache = None
+    if EMAIL_TEMPLATE_BYTECODE_DIR:
+        os.makedirs(EMAIL_TEMPLATE_BYTECODE_DIR, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(EMAIL_TEMPLATE_BYTECODE_DIR)
+
+    return Environment(
+        loader=FileSystemLoader(EMAIL_TEMPLATE_DIR),
+        autoescape=select_autoescape(['html']),
+        auto_reload=EMAIL_TEMPLATE_AUTO_RELOAD,
+        bytecode_cache=bytecode_cache,
+        cache_size=-1,
+        trim_blocks=True,
+        lstrip_blocks=True
+    )
+
+email_environment = _create_environment()
+
+def render_email(template_name, **context):
+    """
+    Render templates/emails/<template_name> with the given context
+    """
+    return email_environment.get_template(f"emails/{template_name}").render(**context)
+
+def preload_email_templates():
+    """
+    Compile every email template up front so the first webhook doesn't pay for it
+    """
+    names = email_environment.list_templates(filter_func=lambda name: name.startswith('emails/'))
+    for name in names:
+        email_environment.get_template(name)
+    return len(names)
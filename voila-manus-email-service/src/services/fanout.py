@@ -0,0 +1,80 @@
+import os
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+
+# Configuration
+FANOUT_WORKERS = int(os.getenv('FANOUT_WORKERS', '8'))
+# Bulkheads for the upstreams every webhook depends on: a Resend outage can only tie up the
+# resend threads, while Supabase lookups and listing fetches keep theirs
+SUPABASE_WORKERS = int(os.getenv('SUPABASE_WORKERS', '8'))
+RESEND_WORKERS = int(os.getenv('RESEND_WORKERS', '16'))
+# Lookups and sends for bulk uploads, kept apart so a backfill can't crowd out live webhooks
+BULK_ORDER_WORKERS = int(os.getenv('BULK_ORDER_WORKERS', '8'))
+# Batched profile queries; separate from the supabase pool, whose customer lookups wait on them
+PROFILE_QUERY_WORKERS = int(os.getenv('PROFILE_QUERY_WORKERS', '2'))
+
+_pools = {}
+_pool_stats = {}
+_stats_lock = threading.Lock()
+
+def create_pool(name, workers):
+    """
+    Create a separate bounded pool for calls to one dependency, so a slow dependency only
+    ties up its own threads
+    """
+    prefix = 'fanout' if name == 'default' else f'fanout-{name}'
+    _pools[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=prefix)
+    _pool_stats[name] = {'workers': workers, 'submitted': 0, 'queued': 0, 'running': 0}
+    return _pools[name]
+
+create_pool('default', FANOUT_WORKERS)
+create_pool('supabase', SUPABASE_WORKERS)
+create_pool('resend', RESEND_WORKERS)
+create_pool('bulk', BULK_ORDER_WORKERS)
+create_pool('profiles', PROFILE_QUERY_WORKERS)
+
+def _count(pool, **changes):
+    with _stats_lock:
+        for name, change in changes.items():
+            _pool_stats[pool][name] += change
+
+def submit_to(pool, fn, *args, **kwargs):
+    """
+    Run fn on the named pool, inside the caller's app context when there is one and with the
+    caller's context variables (such as its latency budget)
+    """
+    app = current_app._get_current_object() if has_app_context() else None
+    context = contextvars.copy_context()
+
+    def call():
+        if app is None:
+            return fn(*args, **kwargs)
+        # The copied context still points at the caller's app context; push a fresh one so
+        # this thread gets its own database session
+        with app.app_context():
+            return fn(*args, **kwargs)
+
+    def run():
+        _count(pool, queued=-1, running=1)
+        try:
+            return context.run(call)
+        finally:
+            _count(pool, running=-1)
+
+    _count(pool, submitted=1, queued=1)
+    return _pools[pool].submit(run)
+
+def submit(fn, *args, **kwargs):
+    """
+    Run fn on the shared default pool
+    """
+    return submit_to('default', fn, *args, **kwargs)
+
+def get_fanout_stats():
+    """
+    Workers, queued and running tasks per pool
+    """
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in _pool_stats.items()}
@@ -0,0 +1,162 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from src.services.metrics import observe, increment
+from src.services.resilience import DeadlineExceeded, budget_timeout
+
+# Configuration
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '10'))
+HTTP_MAX_SESSIONS = int(os.getenv('HTTP_MAX_SESSIONS', '50'))
+HTTP_DEFAULT_TIMEOUT = float(os.getenv('HTTP_DEFAULT_TIMEOUT', '10'))
+
+# Per-host timeouts in seconds, overridable with HTTP_HOST_TIMEOUTS="host=seconds,host=seconds"
+HTTP_HOST_TIMEOUTS = {
+    'api.resend.com': 15.0,
+}
+for _entry in os.getenv('HTTP_HOST_TIMEOUTS', '').split(','):
+    if '=' in _entry:
+        _host, _seconds = _entry.split('=', 1)
+        HTTP_HOST_TIMEOUTS[_host.strip().lower()] = float(_seconds)
+
+_sessions = OrderedDict()
+_request_counts = {}
+# Requests in flight per session; a session evicted while in use is closed by the last one
+_in_use = {}
+_evicted = set()
+_lock = threading.Lock()
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme.lower()}://{parts.netloc.lower()}'
+
+def _create_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_session(url):
+    """
+    Return the pooled keep-alive session for the URL's host, creating it on first use
+    """
+    with _lock:
+        return _lookup(_origin(url))
+
+def _lookup(origin):
+    # Called with _lock held
+    session = _sessions.get(origin)
+    if session is None:
+        session = _create_session()
+        _sessions[origin] = session
+        # Listing sites are open-ended, so drop the least recently used hosts
+        while len(_sessions) > HTTP_MAX_SESSIONS:
+            evicted_origin, evicted = _sessions.popitem(last=False)
+            _request_counts.pop(evicted_origin, None)
+            if _in_use.get(evicted):
+                _evicted.add(evicted)
+            else:
+                evicted.close()
+    else:
+        _sessions.move_to_end(origin)
+    _request_counts[origin] = _request_counts.get(origin, 0) + 1
+    return session
+
+def _acquire(url):
+    """
+    The host's session, counted as in use until _release so eviction doesn't close it mid-request
+    """
+    with _lock:
+        session = _lookup(_origin(url))
+        _in_use[session] = _in_use.get(session, 0) + 1
+    return session
+
+def _release(session):
+    with _lock:
+        remaining = _in_use.pop(session) - 1
+        if remaining:
+            _in_use[session] = remaining
+            return
+        if session not in _evicted:
+            return
+        _evicted.discard(session)
+    session.close()
+
+def get_timeout(url):
+    """
+    Timeout for requests to the URL's host
+    """
+    host = urlsplit(url).hostname or ''
+    return HTTP_HOST_TIMEOUTS.get(host.lower(), HTTP_DEFAULT_TIMEOUT)
+
+def http_request(method, url, timeout=None, upstream=None, **kwargs):
+    """
+    Send a request through the host's pooled session with the host's default timeout, cut down
+    to the caller's remaining latency budget, recording its latency and status code per upstream.
+    upstream names the metrics label and defaults to the host; open-ended hosts such as listing
+    sites should share one name so the metrics don't grow a series per host.
+    """
+    host = (urlsplit(url).hostname or '').lower()
+    upstream = upstream or host
+    timeout, clamped = budget_timeout(host, timeout or get_timeout(url))
+    session = _acquire(url)
+    start = time.perf_counter()
+    status = 'error'
+
+    try:
+        response = session.request(method, url, timeout=timeout, **kwargs)
+        status = str(response.status_code)
+        return response
+    except requests.exceptions.Timeout as e:
+        if clamped:
+            # The budget ran out, not the host's own timeout; don't hold it against the host
+            status = 'deadline'
+            raise DeadlineExceeded(host) from e
+        status = 'timeout'
+        raise
+    finally:
+        # A streamed body keeps its connection checked out of the pool, so closing an
+        # evicted session after this point doesn't cut it off
+        _release(session)
+        observe('voila_upstream_request_duration_seconds', time.perf_counter() - start, host=upstream)
+        increment('voila_upstream_responses_total', host=upstream, status=status)
+
+def http_get(url, **kwargs):
+    return http_request('GET', url, **kwargs)
+
+def http_post(url, **kwargs):
+    return http_request('POST', url, **kwargs)
+
+def get_http_metrics():
+    """
+    Connection reuse per upstream host, read from the urllib3 connection pools
+    """
+    metrics = {}
+
+    with _lock:
+        sessions = list(_sessions.items())
+        request_counts = dict(_request_counts)
+
+    for origin, session in sessions:
+        connections_opened = 0
+        pool_requests = 0
+        adapter = session.get_adapter(origin)
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections_opened += pool.num_connections
+                pool_requests += pool.num_requests
+
+        metrics[origin] = {
+            'requests': request_counts.get(origin, 0),
+            'connections_opened': connections_opened,
+            'connections_reused': max(0, pool_requests - connections_opened),
+            'timeout': get_timeout(origin)
+        }
+
+    return metrics
@@ -0,0 +1,94 @@
+import os
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from src.models.idempotency_key import IdempotencyKey, db
+from src.services.metrics import Counters
+
+# Configuration
+# How long a delivery may hold its key before a retry is allowed to take over
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', '120'))
+# Keys are deleted this long after they were last written; Supabase stops redelivering well before
+IDEMPOTENCY_RETENTION_DAYS = float(os.getenv('IDEMPOTENCY_RETENTION_DAYS', '7'))
+
+_stats = Counters('claimed', 'replayed', 'in_flight_conflicts', 'taken_over', 'released')
+
+def claim_idempotency_key(key):
+    """
+    Try to become the delivery that processes key. Returns None when claimed; otherwise the
+    existing IdempotencyKey, either 'done' with the stored response or still 'in_flight'.
+    A duplicate costs one primary-key lookup; only a claim writes, and commits so it is
+    visible to other workers and replicas straight away.
+    """
+    now = datetime.utcnow()
+    locked_until = now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+
+    existing = db.session.get(IdempotencyKey, key, populate_existing=True)
+    if existing is None:
+        db.session.add(IdempotencyKey(key=key, status='in_flight', locked_until=locked_until))
+        try:
+            db.session.commit()
+            _stats.add('claimed')
+            return None
+        except IntegrityError:
+            # Another delivery inserted it since the lookup
+            db.session.rollback()
+            existing = db.session.get(IdempotencyKey, key, populate_existing=True)
+
+    if existing is not None and existing.status == 'in_flight' and existing.locked_until < now:
+        # Take over a key whose holder crashed or gave up without releasing it
+        taken = db.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key, IdempotencyKey.status == 'in_flight', IdempotencyKey.locked_until < now)
+            .values(locked_until=locked_until, updated_at=now)
+        )
+        db.session.commit()
+        if taken.rowcount == 1:
+            _stats.add('taken_over')
+            return None
+        existing = db.session.get(IdempotencyKey, key, populate_existing=True)
+
+    if existing is None:
+        # Released between our insert and the lookup; let the sender retry
+        existing = IdempotencyKey(key=key, status='in_flight', locked_until=locked_until)
+    _stats.add('replayed' if existing.status == 'done' else 'in_flight_conflicts')
+    return existing
+
+def complete_idempotency_key(key, response, status_code):
+    """
+    Store the response that duplicate deliveries of key will get
+    """
+    db.session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(status='done', status_code=status_code, response=json.dumps(response), locked_until=None,
+                updated_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+def release_idempotency_key(key):
+    """
+    Forget an unfinished key so the next delivery processes it from scratch
+    """
+    db.session.rollback()
+    db.session.query(IdempotencyKey).filter(
+        IdempotencyKey.key == key, IdempotencyKey.status == 'in_flight'
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    _stats.add('released')
+
+def prune_idempotency_keys(retention_days=IDEMPOTENCY_RETENTION_DAYS):
+    """
+    Delete keys last written more than retention_days ago. Returns the number of keys deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.updated_at < cutoff)).rowcount
+    db.session.commit()
+    return deleted
+
+def get_idempotency_stats():
+    stats = _stats.snapshot()
+    stats['lock_seconds'] = IDEMPOTENCY_LOCK_SECONDS
+    stats['retention_days'] = IDEMPOTENCY_RETENTION_DAYS
+    return stats
@@ -0,0 +1,149 @@
+import os
+import time
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from flask import has_app_context
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from src.models.customer_cache_invalidation import CustomerCacheInvalidation, db
+from src.services.cache import TTLCache
+
+# Configuration
+IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL', '900'))
+IDENTITY_CACHE_NEGATIVE_TTL = int(os.getenv('IDENTITY_CACHE_NEGATIVE_TTL', '60'))
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv('IDENTITY_CACHE_MAX_ENTRIES', '1024'))
+# How often each worker reads the invalidations made by other workers and replicas
+IDENTITY_CACHE_INVALIDATION_POLL = float(os.getenv('IDENTITY_CACHE_INVALIDATION_POLL', '5'))
+
+# Cached in place of a record when the lookup failed
+NOT_FOUND = object()
+
+identity_cache = TTLCache('customer_identity', IDENTITY_CACHE_MAX_ENTRIES, IDENTITY_CACHE_TTL)
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+_coalesced = 0
+
+# Invalidations at or after _invalidations_seen have not been applied to this worker's cache yet
+_invalidations_seen = datetime.utcnow()
+_next_invalidation_poll = 0.0
+_invalidation_lock = threading.Lock()
+_invalidations_applied = 0
+
+def get_customer(user_id, loader):
+    """
+    Return the cached {email, name} record for user_id, calling loader(user_id) on a miss.
+    Concurrent misses for the same user wait on a single loader call, and failed lookups
+    are remembered for IDENTITY_CACHE_NEGATIVE_TTL seconds.
+    """
+    global _coalesced
+
+    apply_invalidations()
+    cached = identity_cache.get(user_id)
+    if cached is not None:
+        return None if cached is NOT_FOUND else dict(cached)
+
+    with _inflight_lock:
+        future = _inflight.get(user_id)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _inflight[user_id] = future
+        else:
+            _coalesced += 1
+
+    if not is_leader:
+        result = future.result()
+        return dict(result) if result else None
+
+    try:
+        result = loader(user_id)
+        remember_customer(user_id, result)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(user_id, None)
+
+def remember_customer(user_id, record):
+    """
+    Cache a looked-up record for user_id, or remember for a while that there is none
+    """
+    if record:
+        identity_cache.set(user_id, dict(record))
+    else:
+        identity_cache.set(user_id, NOT_FOUND, ttl=IDENTITY_CACHE_NEGATIVE_TTL)
+
+def is_customer_cached(user_id):
+    apply_invalidations()
+    return identity_cache.get(user_id) is not None
+
+def invalidate_customer(user_id):
+    """
+    Drop the cached record for user_id, e.g. after a profile change. Other workers and replicas
+    drop it within IDENTITY_CACHE_INVALIDATION_POLL seconds. Returns whether this worker had it cached.
+    """
+    invalidated = identity_cache.delete(user_id)
+    now = datetime.utcnow()
+
+    db.session.add(CustomerCacheInvalidation(user_id=user_id, invalidated_at=now))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        db.session.execute(
+            update(CustomerCacheInvalidation)
+            .where(CustomerCacheInvalidation.user_id == user_id)
+            .values(invalidated_at=now)
+        )
+        db.session.commit()
+
+    # Older invalidations can't matter: anything cached before them has expired since
+    db.session.execute(
+        delete(CustomerCacheInvalidation)
+        .where(CustomerCacheInvalidation.invalidated_at < now - timedelta(seconds=2 * IDENTITY_CACHE_TTL))
+    )
+    db.session.commit()
+    return invalidated
+
+def apply_invalidations():
+    """
+    Drop the customers other workers invalidated since the last poll. Polls at most every
+    IDENTITY_CACHE_INVALIDATION_POLL seconds, and only where the database is reachable.
+    """
+    global _invalidations_seen, _next_invalidation_poll, _invalidations_applied
+
+    if time.monotonic() < _next_invalidation_poll or not has_app_context():
+        return
+    if not _invalidation_lock.acquire(blocking=False):
+        # Another thread is polling
+        return
+    try:
+        _next_invalidation_poll = time.monotonic() + IDENTITY_CACHE_INVALIDATION_POLL
+        # Read from a poll interval before the last poll, so a commit that was in flight
+        # during it, or a replica's clock running a little behind, doesn't lose an invalidation
+        polled_at = datetime.utcnow()
+        since = _invalidations_seen - timedelta(seconds=IDENTITY_CACHE_INVALIDATION_POLL)
+        user_ids = db.session.execute(
+            db.select(CustomerCacheInvalidation.user_id).where(CustomerCacheInvalidation.invalidated_at >= since)
+        ).scalars().all()
+        for user_id in user_ids:
+            if identity_cache.delete(user_id):
+                _invalidations_applied += 1
+        _invalidations_seen = polled_at
+    except Exception as e:
+        print(f"Error reading customer cache invalidations: {str(e)}")
+    finally:
+        _invalidation_lock.release()
+
+def get_identity_cache_stats():
+    stats = identity_cache.stats()
+    stats['negative_ttl_seconds'] = IDENTITY_CACHE_NEGATIVE_TTL
+    stats['coalesced_lookups'] = _coalesced
+    stats['invalidation_poll_seconds'] = IDENTITY_CACHE_INVALIDATION_POLL
+    stats['invalidations_applied'] = _invalidations_applied
+    return stats
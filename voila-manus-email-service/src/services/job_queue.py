@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import threading
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import delete, update
+from src.models.job import Job, db
+from src.services.idempotency import prune_idempotency_keys
+from src.services.metrics import observe, timed
+
+# Configuration
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1.0'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_DELAY = int(os.getenv('JOB_RETRY_DELAY', '30'))
+JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', '600'))
+# How often a worker requeues stale jobs and prunes old finished jobs and idempotency keys
+JOB_SWEEP_INTERVAL = int(os.getenv('JOB_SWEEP_INTERVAL', '60'))
+# Succeeded and failed jobs are deleted this long after finishing
+JOB_RETENTION_DAYS = float(os.getenv('JOB_RETENTION_DAYS', '7'))
+
+_job_handlers = {}
+_wakeup = threading.Event()
+
+def register_job_handler(job_type, handler):
+    """
+    Register the function that processes jobs of the given type.
+    Handlers are called as handler(payload, report_progress) and return a JSON-serializable result.
+    """
+    _job_handlers[job_type] = handler
+
+def enqueue_job(job_type, payload, max_attempts=None, run_after=None):
+    """
+    Persist a new job and wake up an idle worker. run_after delays the job until that time.
+    """
+    job = Job(
+        job_type=job_type,
+        payload=json.dumps(payload),
+        status='queued',
+        max_attempts=max_attempts or JOB_MAX_ATTEMPTS,
+        run_after=run_after or datetime.utcnow()
+    )
+    db.session.add(job)
+    db.session.commit()
+    _wakeup.set()
+    return job
+
+def update_job_progress(job_id, progress):
+    """
+    Record the stage a running job has reached
+    """
+    db.session.execute(
+        update(Job).where(Job.id == job_id).values(progress=progress, updated_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+def claim_next_job():
+    """
+    Atomically move the oldest runnable job from 'queued' to 'running'.
+    The conditional UPDATE makes the claim safe when several workers or processes share the queue.
+    """
+    now = datetime.utcnow()
+    candidates = (
+        Job.query
+        .filter(Job.status == 'queued', Job.run_after <= now)
+        .order_by(Job.run_after, Job.id)
+        .limit(JOB_WORKERS * 2)
+        .all()
+    )
+
+    for candidate in candidates:
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == candidate.id, Job.status == 'queued')
+            .values(status='running', attempts=Job.attempts + 1, started_at=now, updated_at=now)
+        )
+        db.session.commit()
+        if claimed.rowcount == 1:
+            return db.session.get(Job, candidate.id, populate_existing=True)
+
+    return None
+
+def run_job(job):
+    """
+    Execute a claimed job and record its outcome
+    """
+    handler = _job_handlers.get(job.job_type)
+
+    if job.started_at and job.run_after:
+        observe('voila_stage_duration_seconds', max(0.0, (job.started_at - job.run_after).total_seconds()),
+                flow=job.job_type, stage='queue_wait')
+
+    try:
+        if handler is None:
+            raise Exception(f"No handler registered for job type: {job.job_type}")
+
+        with timed(job.job_type, 'job'):
+            result = handler(json.loads(job.payload), lambda progress: update_job_progress(job.id, progress))
+
+        job.status = 'succeeded'
+        job.progress = 'done'
+        job.result = json.dumps(result)
+        job.error = None
+        job.finished_at = datetime.utcnow()
+
+    except Exception as e:
+        print(f"Error running job {job.id} ({job.job_type}): {e}")
+        traceback.print_exc()
+        db.session.rollback()
+
+        job.error = str(e)
+        if job.attempts < job.max_attempts:
+            # Back off before the next attempt
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + timedelta(seconds=JOB_RETRY_DELAY * job.attempts)
+        else:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+
+    db.session.commit()
+
+def requeue_stale_jobs():
+    """
+    Return jobs left 'running' by a crashed worker to the queue
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_AFTER)
+    db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.started_at < cutoff)
+        .values(status='queued', progress='requeued', updated_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+def prune_finished_jobs(retention_days=JOB_RETENTION_DAYS):
+    """
+    Delete succeeded and failed jobs that finished more than retention_days ago.
+    Returns the number of jobs deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = db.session.execute(
+        delete(Job).where(Job.status.in_(('succeeded', 'failed')), Job.finished_at < cutoff)
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+def get_queue_stats():
+    """
+    Count jobs per status
+    """
+    rows = db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all()
+    return {status: count for status, count in rows}
+
+class JobWorkerPool:
+    """
+    Pool of daemon threads that pull jobs from the database-backed queue
+    """
+
+    def __init__(self, app, size=JOB_WORKERS, poll_interval=JOB_POLL_INTERVAL):
+        self.app = app
+        self.size = size
+        self.poll_interval = poll_interval
+        self._threads = []
+        self._stopping = threading.Event()
+        self._sweep_lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def start(self):
+        self._sweep()
+
+        for index in range(self.size):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """
+        Stop claiming jobs and wait up to timeout seconds in total for the running ones to finish
+        """
+        self._stopping.set()
+        _wakeup.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def _sweep(self):
+        """
+        Requeue jobs a killed worker left running and prune old finished ones and old webhook
+        idempotency keys, at most once per JOB_SWEEP_INTERVAL; a replacement worker starts before
+        a crashed job is stale, so this can't wait for the next process start
+        """
+        with self._sweep_lock:
+            if time.monotonic() < self._next_sweep:
+                return
+            self._next_sweep = time.monotonic() + JOB_SWEEP_INTERVAL
+
+        try:
+            with self.app.app_context():
+                requeue_stale_jobs()
+                prune_finished_jobs()
+                prune_idempotency_keys()
+        except Exception as e:
+            print(f"Job sweep error: {e}")
+
+    def _work(self):
+        while not self._stopping.is_set():
+            self._sweep()
+            try:
+                with self.app.app_context():
+                    job = claim_next_job()
+                    if job is not None:
+                        run_job(job)
+                        continue
+            except Exception as e:
+                print(f"Job worker error: {e}")
+
+            _wakeup.wait(self.poll_interval)
+            _wakeup.clear()
+
+def start_job_workers(app):
+    """
+    Start the background worker pool for the given app
+    """
+    pool = JobWorkerPool(app)
+    pool.start()
+    return pool
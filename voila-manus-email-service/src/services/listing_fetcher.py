@@ -0,0 +1,181 @@
+import os
+import re
+import time
+from urllib.parse import urlsplit
+import requests
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+from src.services.http_client import http_get
+from src.services.metrics import Counters
+from src.services.resilience import HostPolicies, current_deadline
+
+# Configuration
+PROPERTY_FETCH_MAX_BYTES = int(os.getenv('PROPERTY_FETCH_MAX_BYTES', str(2 * 1024 * 1024)))
+PROPERTY_FETCH_CHUNK_SIZE = int(os.getenv('PROPERTY_FETCH_CHUNK_SIZE', '65536'))
+PROPERTY_FETCH_TAIL_BYTES = int(os.getenv('PROPERTY_FETCH_TAIL_BYTES', '16384'))
+PROPERTY_FETCH_EARLY_STOP = os.getenv('PROPERTY_FETCH_EARLY_STOP', 'true').lower() in ('1', 'true', 'yes')
+PROPERTY_FETCH_TIMEOUT = float(os.getenv('PROPERTY_FETCH_TIMEOUT', '5'))
+# Wall-clock limit on downloading the body. PROPERTY_FETCH_TIMEOUT only applies to each socket
+# read, so a host dripping a byte at a time would otherwise never time out.
+PROPERTY_FETCH_TOTAL_TIMEOUT = float(os.getenv('PROPERTY_FETCH_TOTAL_TIMEOUT', '10'))
+PROPERTY_FETCH_USER_AGENT = os.getenv(
+    'PROPERTY_FETCH_USER_AGENT',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+)
+
+# Politeness per listing host: requests in flight, sustained rate and burst, and how long a
+# webhook may wait for its turn before falling back to the URL
+PROPERTY_FETCH_HOST_CONCURRENCY = int(os.getenv('PROPERTY_FETCH_HOST_CONCURRENCY', '2'))
+PROPERTY_FETCH_HOST_RATE = float(os.getenv('PROPERTY_FETCH_HOST_RATE', '1'))
+PROPERTY_FETCH_HOST_BURST = int(os.getenv('PROPERTY_FETCH_HOST_BURST', '3'))
+PROPERTY_FETCH_MAX_WAIT = float(os.getenv('PROPERTY_FETCH_MAX_WAIT', '1'))
+# A host is skipped for PROPERTY_FETCH_BREAKER_RESET seconds after this many failures in a row
+PROPERTY_FETCH_BREAKER_FAILURES = int(os.getenv('PROPERTY_FETCH_BREAKER_FAILURES', '3'))
+PROPERTY_FETCH_BREAKER_RESET = float(os.getenv('PROPERTY_FETCH_BREAKER_RESET', '60'))
+
+ALLOWED_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# Raw markup that shows the head and each key selector has arrived
+HEAD_END_PATTERN = re.compile(rb'</head\s*>', re.IGNORECASE)
+KEY_MARKER_PATTERNS = {
+    'h1': re.compile(rb'<h1[\s>]', re.IGNORECASE),
+    'price': re.compile(rb'(?:class|data-testid)\s*=\s*["\'][^"\']*\bprice\b', re.IGNORECASE),
+    'location': re.compile(rb'(?:class|data-testid)\s*=\s*["\'][^"\']*\b(?:address|location)\b', re.IGNORECASE),
+    'description': re.compile(rb'(?:class|data-testid)\s*=\s*["\'][^"\']*\bdescription\b', re.IGNORECASE)
+}
+
+# Longest marker we could split across two chunks
+MARKER_OVERLAP = 256
+
+_stats = Counters('fetches', 'bytes_read', 'truncated', 'early_stops', 'rejected_content_type')
+
+listing_hosts = HostPolicies(
+    concurrency=PROPERTY_FETCH_HOST_CONCURRENCY,
+    rate=PROPERTY_FETCH_HOST_RATE,
+    burst=PROPERTY_FETCH_HOST_BURST,
+    failure_threshold=PROPERTY_FETCH_BREAKER_FAILURES,
+    reset_timeout=PROPERTY_FETCH_BREAKER_RESET,
+    max_wait=PROPERTY_FETCH_MAX_WAIT
+)
+
+class ListingPage:
+    """
+    Status, headers and (possibly partial) body of a fetched listing page
+    """
+
+    def __init__(self, status_code, headers, content=b'', truncated=False, early_stop=False):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.truncated = truncated
+        self.early_stop = early_stop
+
+def _check_content_type(response):
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type and content_type not in ALLOWED_CONTENT_TYPES:
+        _stats.add(rejected_content_type=1)
+        raise ValueError(f"Unsupported listing content type: {content_type}")
+
+def _iter_body(response):
+    """
+    Yield the body as each socket read returns it, rather than once a full chunk has arrived,
+    so the caller can stop at its deadline however slowly the host sends
+    """
+    while True:
+        try:
+            chunk = response.raw.read1(PROPERTY_FETCH_CHUNK_SIZE, decode_content=True)
+        # Surface the same exceptions as requests' iter_content, so the host's breaker counts them
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except DecodeError as e:
+            raise requests.exceptions.ContentDecodingError(e)
+        except ReadTimeoutError as e:
+            raise requests.exceptions.ConnectionError(e)
+        if not chunk:
+            return
+        yield chunk
+
+def fetch_listing_page(url, headers=None, max_bytes=None, stop_after_head=None, max_wait=None):
+    """
+    Stream a listing page, stopping at max_bytes or, with early stop enabled, once the
+    </head> and every key selector have arrived with PROPERTY_FETCH_TAIL_BYTES to spare.
+    stop_after_head(head_bytes) may also end the download as soon as </head> arrives.
+    Raises UpstreamUnavailable without fetching when the host's breaker is open or it stays
+    at its concurrency or rate limit for max_wait (PROPERTY_FETCH_MAX_WAIT by default).
+    """
+    host = (urlsplit(url).hostname or '').lower()
+    with listing_hosts.get(host).guard(max_wait):
+        return _fetch(url, dict(headers or {}), max_bytes or PROPERTY_FETCH_MAX_BYTES, stop_after_head)
+
+def _fetch(url, headers, max_bytes, stop_after_head):
+    headers.setdefault('User-Agent', PROPERTY_FETCH_USER_AGENT)
+    deadline = time.monotonic() + PROPERTY_FETCH_TOTAL_TIMEOUT
+    if current_deadline() is not None:
+        deadline = min(deadline, current_deadline())
+    response = http_get(url, headers=headers, stream=True, timeout=PROPERTY_FETCH_TIMEOUT, upstream='listing')
+
+    try:
+        if response.status_code == 304:
+            return ListingPage(304, response.headers)
+        response.raise_for_status()
+        _check_content_type(response)
+
+        buffer = bytearray()
+        found = set()
+        ready_at = None
+        truncated = False
+        early_stop = False
+
+        for chunk in _iter_body(response):
+            scan_from = max(0, len(buffer) - MARKER_OVERLAP)
+            buffer.extend(chunk)
+
+            if len(buffer) >= max_bytes:
+                del buffer[max_bytes:]
+                truncated = True
+                break
+
+            # Out of time or latency budget: extract from what has arrived so far
+            if time.monotonic() >= deadline:
+                truncated = True
+                break
+
+            if not PROPERTY_FETCH_EARLY_STOP:
+                continue
+
+            if ready_at is None:
+                window = bytes(buffer[scan_from:])
+                if 'head' not in found:
+                    head_end = HEAD_END_PATTERN.search(window)
+                    if head_end:
+                        found.add('head')
+                        if stop_after_head and stop_after_head(bytes(buffer[:scan_from + head_end.end()])):
+                            early_stop = True
+                            break
+                for name, pattern in KEY_MARKER_PATTERNS.items():
+                    if name not in found and pattern.search(window):
+                        found.add(name)
+                if len(found) == len(KEY_MARKER_PATTERNS) + 1:
+                    ready_at = len(buffer)
+
+            if ready_at is not None and len(buffer) - ready_at >= PROPERTY_FETCH_TAIL_BYTES:
+                early_stop = True
+                break
+
+        _stats.add(fetches=1, bytes_read=len(buffer), truncated=int(truncated), early_stops=int(early_stop))
+        return ListingPage(response.status_code, response.headers, bytes(buffer), truncated, early_stop)
+
+    finally:
+        response.close()
+
+def get_listing_fetch_stats():
+    stats = _stats.snapshot()
+    stats['max_bytes'] = PROPERTY_FETCH_MAX_BYTES
+    stats['early_stop'] = PROPERTY_FETCH_EARLY_STOP
+    stats['open_breakers'] = sum(host['open'] for host in listing_hosts.snapshot().values())
+    return stats
+
+def get_listing_host_stats():
+    """
+    Breaker state, failures and rejected fetches per listing host
+    """
+    return listing_hosts.snapshot()
@@ -0,0 +1,113 @@
+import os
+from concurrent.futures import Future
+from src.services.batching import BatchCollector
+from src.models.email_log import EmailLog, db
+from src.services.body_store import store_email_body
+
+# Configuration
+EMAIL_LOG_GROUP_COMMIT = os.getenv('EMAIL_LOG_GROUP_COMMIT', 'false').lower() in ('1', 'true', 'yes')
+# Extra time to wait for more rows; with 0 a batch is whatever queued up during the previous commit
+EMAIL_LOG_FLUSH_MS = int(os.getenv('EMAIL_LOG_FLUSH_MS', '0'))
+EMAIL_LOG_BATCH_SIZE = int(os.getenv('EMAIL_LOG_BATCH_SIZE', '200'))
+
+class EmailLogWriter(BatchCollector):
+    """
+    Single writer thread that inserts the EmailLog rows queued while its previous commit was
+    running in one transaction, so concurrent workers share one commit (and one fsync) instead of queueing
+    for the SQLite write lock one by one. Callers still wait until their row is committed.
+    """
+
+    thread_name = 'email-log-writer'
+
+    def __init__(self, app, flush_ms=EMAIL_LOG_FLUSH_MS, batch_size=EMAIL_LOG_BATCH_SIZE):
+        super().__init__(flush_ms, batch_size, {'rows': 0, 'commits': 0, 'failed_batches': 0, 'failed_rows': 0,
+                                                'max_batch': 0})
+        self.app = app
+
+    def write(self, html, kind, fields):
+        """
+        Queue a row and return a Future for its EmailLog id
+        """
+        future = Future()
+        self._put((html, kind, fields, future))
+        return future
+
+    def _process(self, batch):
+        with self.app.app_context():
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            logs = [self._add_log(html, kind, fields) for html, kind, fields, _ in batch]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Group commit of {len(batch)} email logs failed, writing individually: {e}")
+            self._record(failed_batches=1)
+            for entry in batch:
+                self._flush_one(*entry)
+            return
+
+        self._record(rows=len(batch), commits=1, max_batch=len(batch))
+        for (_, _, _, future), email_log in zip(batch, logs):
+            future.set_result(email_log.id)
+
+    def _flush_one(self, html, kind, fields, future):
+        try:
+            email_log = self._add_log(html, kind, fields)
+            db.session.commit()
+            self._record(rows=1, commits=1)
+            future.set_result(email_log.id)
+        except Exception as e:
+            db.session.rollback()
+            self._record(failed_rows=1)
+            future.set_exception(e)
+
+    def _add_log(self, html, kind, fields):
+        email_log = EmailLog(body_hash=store_email_body(html, kind), **fields)
+        db.session.add(email_log)
+        return email_log
+
+    def stats(self):
+        stats = self._snapshot()
+        stats['enabled'] = True
+        stats['flush_ms'] = int(self.window * 1000)
+        stats['rows_per_commit'] = round(stats['rows'] / stats['commits'], 2) if stats['commits'] else 0.0
+        return stats
+
+_writer = None
+
+def start_email_log_writer(app):
+    """
+    Create the group-commit writer when EMAIL_LOG_GROUP_COMMIT is on
+    """
+    global _writer
+    if EMAIL_LOG_GROUP_COMMIT and _writer is None:
+        _writer = EmailLogWriter(app)
+    return _writer
+
+def stop_email_log_writer(timeout=None):
+    """
+    Commit the rows still queued before the process exits
+    """
+    if _writer is not None:
+        _writer.stop(timeout)
+
+def write_email_log(html, kind, **fields):
+    """
+    Log a sent email with its body and return the EmailLog id.
+    With group commit the row is committed by the writer thread before this returns;
+    otherwise it is only flushed, and the caller's next commit makes it durable.
+    """
+    if _writer is not None:
+        return _writer.write(html, kind, fields).result()
+
+    email_log = EmailLog(body_hash=store_email_body(html, kind), **fields)
+    db.session.add(email_log)
+    db.session.flush()
+    return email_log.id
+
+def get_email_log_writer_stats():
+    if _writer is None:
+        return {'enabled': False}
+    return _writer.stats()
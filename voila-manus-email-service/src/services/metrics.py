@@ -0,0 +1,243 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+# Configuration
+METRICS_BUCKETS = [
+    float(bucket) for bucket in
+    os.getenv('METRICS_BUCKETS', '0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30').split(',')
+]
+
+METRIC_HELP = {
+    'voila_request_duration_seconds': ('histogram', 'Time to answer each API endpoint, per response status'),
+    'voila_stage_duration_seconds': ('histogram', 'Time spent in each stage of a webhook flow'),
+    'voila_upstream_request_duration_seconds': ('histogram', 'Latency of outbound HTTP requests per upstream host'),
+    'voila_upstream_responses_total': ('counter', 'Outbound HTTP responses per upstream host and status code'),
+    'voila_stage_errors_total': ('counter', 'Stages that raised an exception'),
+    'voila_listing_host_open': ('gauge', '1 while the circuit breaker for a listing host is open or half open'),
+    'voila_upstream_open': ('gauge', '1 while the circuit breaker for Supabase or Resend is open or half open'),
+    'voila_fanout_pool_running': ('gauge', 'Tasks running on each bulkhead thread pool'),
+    'voila_fanout_pool_queued': ('gauge', 'Tasks waiting for a thread in each bulkhead pool')
+}
+
+class Counters:
+    """
+    A module's named event counters, reported in its /api/health stats and as /api/metrics gauges.
+    add('hits') counts one event; add(bytes_read=n, ...) adds to several counters at once.
+    """
+
+    def __init__(self, *names):
+        self._values = dict.fromkeys(names, 0)
+        self._lock = threading.Lock()
+
+    def add(self, *names, **counts):
+        with self._lock:
+            for name in names:
+                self._values[name] += 1
+            for name, value in counts.items():
+                self._values[name] += value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed buckets, in the Prometheus sense
+    """
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def observe(name, seconds, **labels):
+    """
+    Record a duration in the histogram identified by name and labels
+    """
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+def increment(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+@contextmanager
+def timed(flow, stage):
+    """
+    Time the enclosed block as one stage of a webhook flow, counting it as an error if it raises
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        increment('voila_stage_errors_total', flow=flow, stage=stage)
+        raise
+    finally:
+        observe('voila_stage_duration_seconds', time.perf_counter() - start, flow=flow, stage=stage)
+
+def timed_call(flow, stage, fn, *args, **kwargs):
+    """
+    Call fn inside timed(flow, stage); handy for work submitted to a pool
+    """
+    with timed(flow, stage):
+        return fn(*args, **kwargs)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def gauge_samples(prefix, stats, label=None):
+    """
+    Turn a stats dict into (name, labels, value) gauge samples, skipping non-numeric values.
+    With label set, stats maps each label value to a stats dict or a single number.
+    """
+    samples = []
+    groups = stats.items() if label else [(None, stats)]
+    for label_value, group in groups:
+        labels = ((label, label_value),) if label else ()
+        if isinstance(group, dict):
+            for field, value in group.items():
+                if isinstance(value, (int, float)):
+                    samples.append((f"{prefix}_{field}", labels, value))
+        elif isinstance(group, (int, float)):
+            samples.append((prefix, labels, group))
+    return samples
+
+def render_prometheus(gauges=()):
+    """
+    Render every histogram and counter, followed by the given gauge samples, in the
+    Prometheus text exposition format. The numbers are this process's own, so every sample
+    carries a worker label with its pid.
+    """
+    with _lock:
+        histograms = {key: (list(h.cumulative()), h.count, h.sum) for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    worker = (('worker', str(os.getpid())),)
+    histograms = {(name, labels + worker): value for (name, labels), value in histograms.items()}
+    counters = {(name, labels + worker): value for (name, labels), value in counters.items()}
+    gauges = [(name, labels + worker, value) for name, labels, value in gauges]
+
+    lines = []
+    described = set()
+
+    def describe(name, default_type):
+        if name in described:
+            return
+        described.add(name)
+        metric_type, help_text = METRIC_HELP.get(name, (default_type, name.replace('_', ' ')))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+    for (name, labels), (buckets, count, total) in sorted(histograms.items()):
+        describe(name, 'histogram')
+        for bound, cumulative in buckets:
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    for (name, labels), value in sorted(counters.items()):
+        describe(name, 'counter')
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    # Samples of one metric have to be grouped together
+    for name, labels, value in sorted(gauges, key=lambda sample: sample[0]):
+        describe(name, 'gauge')
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    return '\n'.join(lines) + '\n'
+
+def get_metrics_summary():
+    """
+    Per-endpoint and per-stage latency and upstream status counts, summarised for /api/health
+    """
+    with _lock:
+        summaries = [
+            (name, labels, {
+                'count': histogram.count,
+                'avg_ms': round(histogram.sum / histogram.count * 1000, 2) if histogram.count else 0.0,
+                'p50_ms': round(histogram.quantile(0.5) * 1000, 2),
+                'p95_ms': round(histogram.quantile(0.95) * 1000, 2),
+                'max_ms': round(histogram.max * 1000, 2)
+            })
+            for (name, labels), histogram in _histograms.items()
+        ]
+        counters = dict(_counters)
+
+    endpoints = {}
+    stages = {}
+    upstreams = {}
+
+    for name, labels, summary in summaries:
+        labels = dict(labels)
+        if name == 'voila_request_duration_seconds':
+            endpoints.setdefault(labels['endpoint'], {})[labels['status']] = summary
+        elif name == 'voila_stage_duration_seconds':
+            summary['errors'] = counters.get(_key('voila_stage_errors_total', labels), 0)
+            stages.setdefault(labels['flow'], {})[labels['stage']] = summary
+        elif name == 'voila_upstream_request_duration_seconds':
+            upstreams.setdefault(labels['host'], {})['latency'] = summary
+
+    for (name, labels), value in counters.items():
+        if name == 'voila_upstream_responses_total':
+            labels = dict(labels)
+            statuses = upstreams.setdefault(labels['host'], {}).setdefault('responses', {})
+            statuses[labels['status']] = value
+
+    return {'endpoints': endpoints, 'stages': stages, 'upstreams': upstreams}
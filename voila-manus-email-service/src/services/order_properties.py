@@ -0,0 +1,81 @@
+import os
+import json
+from datetime import datetime, timedelta
+from src.models.order_property import OrderProperty, db
+from src.services.job_queue import enqueue_job
+from src.services.metrics import Counters
+
+# Configuration
+# Re-extract each order's listing once in the background after the order, so the
+# video-completed email gets current details without scraping at completion time
+ORDER_PROPERTY_REFRESH = os.getenv('ORDER_PROPERTY_REFRESH', 'false').lower() in ('1', 'true', 'yes')
+ORDER_PROPERTY_REFRESH_AFTER = int(os.getenv('ORDER_PROPERTY_REFRESH_AFTER', '86400'))
+
+REFRESH_JOB_TYPE = 'refresh_order_property'
+
+_stats = Counters('stored', 'hits', 'misses', 'refreshes_scheduled', 'refreshed', 'refresh_kept')
+
+def store_order_property(order_id, property_url, property_info, extraction_strategy):
+    """
+    Keep the property information an order was confirmed with. Adds to the session without committing.
+    """
+    row = db.session.get(OrderProperty, order_id) or OrderProperty(order_id=order_id)
+    row.property_url = property_url
+    row.property_info = json.dumps(property_info)
+    row.extraction_strategy = extraction_strategy
+    db.session.add(row)
+    _stats.add('stored')
+    return row
+
+def load_order_property(order_id):
+    """
+    The property information stored for an order, or None for orders placed before it was kept
+    """
+    row = db.session.get(OrderProperty, order_id)
+    if row is None:
+        _stats.add('misses')
+        return None
+    _stats.add('hits')
+    return row.property_info_data
+
+def schedule_order_property_refresh(order_id):
+    """
+    Queue the background refresh of an order's property information. Does nothing unless
+    ORDER_PROPERTY_REFRESH is enabled.
+    """
+    if not ORDER_PROPERTY_REFRESH:
+        return None
+    _stats.add('refreshes_scheduled')
+    return enqueue_job(
+        REFRESH_JOB_TYPE, {'order_id': order_id},
+        run_after=datetime.utcnow() + timedelta(seconds=ORDER_PROPERTY_REFRESH_AFTER)
+    )
+
+def refresh_order_property(order_id, extract):
+    """
+    Re-extract an order's listing with extract(property_url) -> (property_info, strategy) and
+    store the result. A listing that can no longer be extracted keeps what was stored before.
+    """
+    row = db.session.get(OrderProperty, order_id)
+    if row is None:
+        return {'success': True, 'refreshed': False, 'reason': 'order not found'}
+
+    property_info, extraction_strategy = extract(row.property_url)
+    if extraction_strategy == 'url_fallback':
+        # Taken down or unreachable: a URL-derived title is worse than what we have
+        _stats.add('refresh_kept')
+        return {'success': True, 'refreshed': False, 'reason': 'listing unavailable',
+                'extraction_strategy': row.extraction_strategy}
+
+    row.property_info = json.dumps(property_info)
+    row.extraction_strategy = extraction_strategy
+    row.refreshed_at = datetime.utcnow()
+    db.session.commit()
+    _stats.add('refreshed')
+    return {'success': True, 'refreshed': True, 'extraction_strategy': extraction_strategy}
+
+def get_order_property_stats():
+    stats = _stats.snapshot()
+    stats['refresh_enabled'] = ORDER_PROPERTY_REFRESH
+    stats['refresh_after_seconds'] = ORDER_PROPERTY_REFRESH_AFTER
+    return stats
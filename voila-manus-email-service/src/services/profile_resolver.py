@@ -0,0 +1,89 @@
+import os
+import time
+from concurrent.futures import Future
+from src.services.batching import BatchCollector
+from src.services.fanout import submit_to
+from src.services.resilience import DeadlineExceeded, current_deadline, deadline_at
+
+# Configuration
+PROFILE_BATCHING = os.getenv('PROFILE_BATCHING', 'true').lower() in ('1', 'true', 'yes')
+PROFILE_BATCH_WINDOW_MS = int(os.getenv('PROFILE_BATCH_WINDOW_MS', '10'))
+# Ids per user_id=in.(...) query; 100 UUIDs keep the URL around 4 KB
+PROFILE_BATCH_MAX_SIZE = int(os.getenv('PROFILE_BATCH_MAX_SIZE', '100'))
+
+class ProfileResolver(BatchCollector):
+    """
+    Coalesce profile lookups arriving within a short window into one query.
+
+    fetch_batch(user_ids) fetches several users at once and returns a dict mapping each
+    user_id found to its record; users missing from it resolve to None. Lookups for the same
+    user in one window share a single slot in the query. Like the email dispatcher, each lookup
+    keeps its caller's latency budget and a query gets the earliest deadline of its lookups.
+    Queries run on the profiles fanout pool, so one slow query doesn't hold up the next window.
+    """
+
+    thread_name = 'profile-resolver'
+
+    def __init__(self, fetch_batch, window_ms=PROFILE_BATCH_WINDOW_MS, max_size=PROFILE_BATCH_MAX_SIZE):
+        super().__init__(window_ms, max_size, {'lookups': 0, 'queries': 0, 'queried_users': 0, 'found': 0,
+                                               'failed_queries': 0, 'expired': 0, 'max_batch': 0})
+        self.fetch_batch = fetch_batch
+
+    def resolve(self, user_id):
+        """
+        Queue a lookup and return a Future for the user's record, or None if there is no profile
+        """
+        future = Future()
+        self._put((user_id, future, current_deadline()))
+        return future
+
+    def _new_batch(self):
+        return {}
+
+    def _add(self, batch, lookup):
+        user_id, future, deadline = lookup
+        self._record(lookups=1)
+        batch.setdefault(user_id, []).append((future, deadline))
+
+    def _process(self, batch):
+        submit_to('profiles', self._resolve, batch)
+
+    def _resolve(self, batch):
+        # Lookups whose budget ran out while queued are answered without querying for them
+        now = time.monotonic()
+        live = {}
+        for user_id, waiters in batch.items():
+            for future, deadline in waiters:
+                if deadline is not None and deadline <= now:
+                    self._record(expired=1)
+                    future.set_exception(DeadlineExceeded('supabase'))
+                else:
+                    live.setdefault(user_id, []).append((future, deadline))
+        batch = live
+        if not batch:
+            return
+
+        deadlines = [deadline for waiters in batch.values() for _, deadline in waiters if deadline is not None]
+        try:
+            with deadline_at(min(deadlines) if deadlines else None):
+                records = self.fetch_batch(list(batch))
+        except Exception as e:
+            self._record(queries=1, queried_users=len(batch), failed_queries=1)
+            for waiters in batch.values():
+                for future, _ in waiters:
+                    future.set_exception(e)
+            return
+
+        self._record(queries=1, queried_users=len(batch), found=len(records), max_batch=len(batch))
+        for user_id, waiters in batch.items():
+            record = records.get(user_id)
+            for future, _ in waiters:
+                future.set_result(dict(record) if record else None)
+
+    def stats(self):
+        stats = self._snapshot()
+        stats['enabled'] = PROFILE_BATCHING
+        stats['window_ms'] = int(self.window * 1000)
+        stats['max_batch_size'] = self.max_size
+        stats['users_per_query'] = round(stats['queried_users'] / stats['queries'], 2) if stats['queries'] else 0.0
+        return stats
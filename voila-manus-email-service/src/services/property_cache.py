@@ -0,0 +1,154 @@
+import os
+import copy
+import json
+import hashlib
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from flask import has_app_context
+from sqlalchemy.orm import Session
+from src.models.property_cache import PropertyCacheEntry, db
+from src.services.cache import TTLCache
+from src.services.metrics import Counters
+
+# Configuration
+PROPERTY_CACHE_TTL = int(os.getenv('PROPERTY_CACHE_TTL', '21600'))
+PROPERTY_CACHE_MAX_ENTRIES = int(os.getenv('PROPERTY_CACHE_MAX_ENTRIES', '512'))
+PROPERTY_CACHE_PERSIST = os.getenv('PROPERTY_CACHE_PERSIST', 'false').lower() in ('1', 'true', 'yes')
+
+# Query parameters left out of the cache key besides utm_*; only ad click ids and analytics ids
+# by default, since names like ref or source carry the listing id on some sites.
+# Override with PROPERTY_CACHE_TRACKING_PARAMS="fbclid,gclid,..."
+TRACKING_PARAMS = {
+    name.strip().lower()
+    for name in os.getenv(
+        'PROPERTY_CACHE_TRACKING_PARAMS',
+        'fbclid,gclid,dclid,msclkid,yclid,gbraid,wbraid,igshid,mc_cid,mc_eid,_ga,_gl'
+    ).split(',')
+    if name.strip()
+}
+
+property_cache = TTLCache('property_info', PROPERTY_CACHE_MAX_ENTRIES, PROPERTY_CACHE_TTL)
+
+_counters = Counters('persistent_hits', 'revalidated', 'stale_hits', 'stores')
+
+def normalize_url(url):
+    """
+    Canonical cache key for a listing URL: lowercase scheme and host, no default port,
+    no fragment, no tracking parameters and a stable query parameter order
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not (scheme == 'http' and parts.port == 80) and not (scheme == 'https' and parts.port == 443):
+        host = f'{host}:{parts.port}'
+
+    query = [
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith('utm_') and name.lower() not in TRACKING_PARAMS
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+def _url_hash(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def _load_persistent(key):
+    if not PROPERTY_CACHE_PERSIST or not has_app_context():
+        return None
+
+    row = db.session.get(PropertyCacheEntry, _url_hash(key))
+    if row is None:
+        return None
+
+    return {
+        'property_info': json.loads(row.property_info),
+        'etag': row.etag,
+        'last_modified': row.last_modified,
+        'expires_at': row.expires_at
+    }
+
+def _save_persistent(key, entry):
+    """
+    Write the entry in its own session, so the caller's transaction is neither committed
+    nor rolled back by a cache store
+    """
+    if not PROPERTY_CACHE_PERSIST or not has_app_context():
+        return
+
+    try:
+        with Session(db.engine) as session:
+            row = session.get(PropertyCacheEntry, _url_hash(key)) or PropertyCacheEntry(url_hash=_url_hash(key), url=key)
+            row.property_info = json.dumps(entry['property_info'])
+            row.etag = entry['etag']
+            row.last_modified = entry['last_modified']
+            row.fetched_at = datetime.utcnow()
+            row.expires_at = datetime.utcnow() + timedelta(seconds=PROPERTY_CACHE_TTL)
+            session.add(row)
+            session.commit()
+    except Exception as e:
+        print(f"Error persisting property cache entry: {e}")
+
+def get_fresh(key):
+    """
+    Return cached property info that is still within its TTL, checking memory then SQLite
+    """
+    entry = property_cache.get(key)
+    if entry is not None:
+        return copy.deepcopy(entry['property_info'])
+
+    stored = _load_persistent(key)
+    if stored and stored['expires_at'] > datetime.utcnow():
+        remaining = (stored.pop('expires_at') - datetime.utcnow()).total_seconds()
+        property_cache.set(key, stored, ttl=remaining)
+        _counters.add('persistent_hits')
+        return copy.deepcopy(stored['property_info'])
+
+    return None
+
+def get_validators(key):
+    """
+    Return the expired entry for key, if any, so the fetch can be made conditional
+    """
+    entry = property_cache.get_stale(key)
+    if entry is None:
+        entry = _load_persistent(key)
+    if entry and (entry.get('etag') or entry.get('last_modified')):
+        return entry
+    return None
+
+def get_stale(key):
+    """
+    Return expired property info for key, if any, for when the listing site can't be reached
+    """
+    entry = property_cache.get_stale(key)
+    if entry is None:
+        entry = _load_persistent(key)
+    if entry is None:
+        return None
+    _counters.add('stale_hits')
+    return copy.deepcopy(entry['property_info'])
+
+def mark_revalidated(key, entry):
+    """
+    The origin answered 304 Not Modified, so extend the expired entry's lifetime
+    """
+    _counters.add('revalidated')
+    store(key, entry['property_info'], entry.get('etag'), entry.get('last_modified'))
+    return copy.deepcopy(entry['property_info'])
+
+def store(key, property_info, etag=None, last_modified=None):
+    entry = {
+        'property_info': copy.deepcopy(property_info),
+        'etag': etag,
+        'last_modified': last_modified
+    }
+    property_cache.set(key, entry)
+    _save_persistent(key, entry)
+    _counters.add('stores')
+
+def get_property_cache_stats():
+    stats = property_cache.stats()
+    stats.update(_counters.snapshot())
+    stats['persistent'] = PROPERTY_CACHE_PERSIST
+    return stats
@@ -0,0 +1,287 @@
+import os
+import re
+import time
+import threading
+from bs4 import BeautifulSoup
+from src.services.structured_data import extract_structured_data, is_complete
+
+# Use lxml when it is installed; it parses large listing pages several times faster
+try:
+    import lxml  # noqa: F401
+    DEFAULT_HTML_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_HTML_PARSER = 'html.parser'
+
+HTML_PARSER = os.getenv('PROPERTY_HTML_PARSER', DEFAULT_HTML_PARSER)
+
+# Selectors per field, in priority order. Each is ('class', name) or ('testid', value).
+TITLE_SELECTORS = [('testid', 'property-title'), ('class', 'property-title'), ('class', 'listing-title'),
+                   ('class', 'property-address'), ('class', 'address')]
+LOCATION_SELECTORS = [('class', 'address'), ('class', 'location'), ('class', 'property-address'),
+                      ('testid', 'address'), ('testid', 'location')]
+PRICE_SELECTORS = [('class', 'price'), ('class', 'property-price'), ('class', 'listing-price'),
+                   ('testid', 'price')]
+DESCRIPTION_SELECTORS = [('class', 'description'), ('class', 'property-description'),
+                         ('class', 'listing-description'), ('testid', 'description')]
+
+WANTED_CLASSES = {name for kind, name in TITLE_SELECTORS + LOCATION_SELECTORS + PRICE_SELECTORS + DESCRIPTION_SELECTORS if kind == 'class'}
+WANTED_TESTIDS = {name for kind, name in TITLE_SELECTORS + LOCATION_SELECTORS + PRICE_SELECTORS + DESCRIPTION_SELECTORS if kind == 'testid'}
+
+# Property types in priority order; the first type with any keyword in the page wins
+PROPERTY_TYPE_KEYWORDS = [
+    ('condominium', ['condo', 'condominium', 'unit']),
+    ('townhouse', ['townhouse', 'townhome', 'row house']),
+    ('apartment', ['apartment', 'apt']),
+    ('commercial', ['commercial', 'office', 'retail', 'warehouse']),
+    ('luxury_home', ['luxury', 'estate', 'mansion', 'villa'])
+]
+
+_keyword_priority = {}
+for _priority, (_property_type, _keywords) in enumerate(PROPERTY_TYPE_KEYWORDS):
+    for _keyword in _keywords:
+        _keyword_priority.setdefault(_keyword, _priority)
+
+# Zero-width lookahead so overlapping keywords are all seen, as with substring checks
+PROPERTY_TYPE_PATTERN = re.compile(
+    '(?=(' + '|'.join(re.escape(keyword) for keyword in sorted(_keyword_priority, key=len, reverse=True)) + '))'
+)
+
+# Features in output order, combined into one alternation of named groups
+FEATURE_PATTERNS = [
+    ('bedrooms', r'(?P<bedrooms>\d+)\s*bed'),
+    ('bathrooms', r'(?P<bathrooms>\d+)\s*bath'),
+    ('square_feet', r'(?P<square_feet>\d+[\d,]*)\s*sq\s*ft'),
+    ('garage', r'(?P<garage>\d+)\s*car\s*garage'),
+    ('pool', r'(?P<pool>pool)'),
+    ('fireplace', r'(?P<fireplace>fireplace)'),
+    ('garden', r'(?P<garden>garden)'),
+    ('balcony', r'(?P<balcony>balcony)')
+]
+FEATURE_PATTERN = re.compile('|'.join(pattern for _, pattern in FEATURE_PATTERNS))
+
+_strategy_stats = {}
+_strategy_lock = threading.Lock()
+
+def parse_html(content):
+    return BeautifulSoup(content, HTML_PARSER)
+
+def extract_from_soup(soup, url):
+    """
+    Extract the property info dict with a single walk over the DOM and a single lowered text scan
+    """
+    first_title = None
+    first_og_title = None
+    h1_elements = []
+    selector_matches = {}
+
+    for element in soup.find_all(True):
+        name = element.name
+        if name == 'title':
+            if first_title is None:
+                first_title = element
+        elif name == 'h1':
+            h1_elements.append(element)
+        elif name == 'meta':
+            if first_og_title is None and element.get('property') == 'og:title':
+                first_og_title = element
+
+        classes = element.get('class')
+        if classes:
+            for class_name in classes:
+                if class_name in WANTED_CLASSES and ('class', class_name) not in selector_matches:
+                    selector_matches[('class', class_name)] = element
+
+        testid = element.get('data-testid')
+        if testid in WANTED_TESTIDS and ('testid', testid) not in selector_matches:
+            selector_matches[('testid', testid)] = element
+
+    text_content = soup.get_text().lower()
+
+    return {
+        'title': _extract_title(first_title, h1_elements, selector_matches, first_og_title, url),
+        'type': extract_property_type(text_content),
+        'location': _extract_location(selector_matches),
+        'price': _extract_price(selector_matches),
+        'features': extract_key_features(text_content),
+        'description': _extract_description(selector_matches)
+    }
+
+def extract_from_html(content, url):
+    return extract_from_soup(parse_html(content), url)
+
+def extract_listing(content, url):
+    """
+    Extract property info, reading JSON-LD/OpenGraph first and running the DOM heuristics
+    only when structured data is missing a title, price or location.
+    Returns (property_info, strategy).
+    """
+    start = time.perf_counter()
+    structured_info = extract_structured_data(content)
+
+    schema_type = structured_info.pop('type', None)
+
+    if is_complete(structured_info):
+        structured_text = ' '.join([structured_info['title'], structured_info.get('description', '')]).lower()
+        property_info = {
+            'title': structured_info['title'],
+            'type': extract_property_type(structured_text),
+            'location': structured_info['location'],
+            'price': structured_info['price'],
+            'features': structured_info.get('features') or extract_key_features(structured_text),
+            'description': structured_info.get('description', '')
+        }
+        strategy = 'structured_data'
+    else:
+        property_info = extract_from_html(content, url)
+        property_info.update(structured_info)
+        strategy = 'structured_data+heuristics' if structured_info or schema_type else 'heuristics'
+
+    # Keywords are more specific than schema.org types, which only refine the default
+    if schema_type and property_info['type'] == 'residential_home':
+        property_info['type'] = schema_type
+
+    record_extraction(strategy, time.perf_counter() - start)
+    return property_info, strategy
+
+def has_complete_structured_data(content):
+    return is_complete(extract_structured_data(content))
+
+def record_extraction(strategy, seconds=0.0):
+    """
+    Count which extraction strategy produced a result and how long it took
+    """
+    with _strategy_lock:
+        stats = _strategy_stats.setdefault(strategy, {'count': 0, 'total_ms': 0.0})
+        stats['count'] += 1
+        stats['total_ms'] += seconds * 1000
+
+def get_extraction_stats():
+    with _strategy_lock:
+        return {
+            strategy: {
+                'count': stats['count'],
+                'avg_ms': round(stats['total_ms'] / stats['count'], 3) if stats['count'] else 0.0
+            }
+            for strategy, stats in _strategy_stats.items()
+        }
+
+def _extract_title(title_tag, h1_elements, selector_matches, og_title, url):
+    # Strategy 1: Page title
+    if title_tag:
+        title = title_tag.get_text().strip()
+        # Clean up common title patterns
+        title = re.sub(r'\s*\|\s*.*$', '', title)  # Remove site name after |
+        title = re.sub(r'\s*-\s*.*$', '', title)   # Remove site name after -
+        if len(title) > 10 and 'for sale' in title.lower() or 'for rent' in title.lower():
+            return title
+
+    # Strategy 2: H1 tags
+    for h1 in h1_elements:
+        text = h1.get_text().strip()
+        if len(text) > 10 and len(text) < 200:
+            return text
+
+    # Strategy 3: Property-specific selectors
+    for selector in TITLE_SELECTORS:
+        element = selector_matches.get(selector)
+        if element:
+            text = element.get_text().strip()
+            if len(text) > 5:
+                return text
+
+    # Strategy 4: Meta tags
+    if og_title:
+        return og_title.get('content', '').strip()
+
+    # Fallback
+    return generate_title_from_url(url)
+
+def _extract_location(selector_matches):
+    for selector in LOCATION_SELECTORS:
+        element = selector_matches.get(selector)
+        if element:
+            return element.get_text().strip()
+
+    return ''
+
+def _extract_price(selector_matches):
+    for selector in PRICE_SELECTORS:
+        element = selector_matches.get(selector)
+        if element:
+            price_text = element.get_text().strip()
+            if '$' in price_text:
+                return price_text
+
+    return ''
+
+def _extract_description(selector_matches):
+    for selector in DESCRIPTION_SELECTORS:
+        element = selector_matches.get(selector)
+        if element:
+            desc = element.get_text().strip()
+            if len(desc) > 50:
+                return desc[:500] + '...' if len(desc) > 500 else desc
+
+    return ''
+
+def extract_property_type(text_content):
+    """
+    Determine property type from lowered page text
+    """
+    best_priority = None
+    for match in PROPERTY_TYPE_PATTERN.finditer(text_content):
+        priority = _keyword_priority[match.group(1)]
+        if best_priority is None or priority < best_priority:
+            best_priority = priority
+            if priority == 0:
+                break
+
+    if best_priority is None:
+        return 'residential_home'
+    return PROPERTY_TYPE_KEYWORDS[best_priority][0]
+
+def extract_key_features(text_content):
+    """
+    Extract key property features from lowered page text, keeping the first match of each
+    """
+    first_matches = {}
+    for match in FEATURE_PATTERN.finditer(text_content):
+        feature_name = match.lastgroup
+        if feature_name not in first_matches:
+            first_matches[feature_name] = match.group(feature_name)
+            if len(first_matches) == len(FEATURE_PATTERNS):
+                break
+
+    features = []
+    for feature_name, _ in FEATURE_PATTERNS:
+        if feature_name not in first_matches:
+            continue
+        value = first_matches[feature_name]
+        if feature_name in ['bedrooms', 'bathrooms', 'garage']:
+            features.append(f"{value} {feature_name}")
+        elif feature_name == 'square_feet':
+            features.append(f"{value} sq ft")
+        else:
+            features.append(feature_name)
+
+    return features[:5]  # Limit to top 5 features
+
+def generate_title_from_url(url):
+    """
+    Generate a title from URL as fallback
+    """
+    try:
+        # Extract meaningful parts from URL
+        parts = url.split('/')
+        for part in reversed(parts):
+            if part and len(part) > 3:
+                # Clean up URL part
+                title = part.replace('-', ' ').replace('_', ' ')
+                title = re.sub(r'\d+', '', title)  # Remove numbers
+                title = ' '.join(word.capitalize() for word in title.split() if len(word) > 2)
+                if len(title) > 5:
+                    return f"Property at {title}"
+
+        return "Beautiful Property"
+    except:
+        return "Beautiful Property"
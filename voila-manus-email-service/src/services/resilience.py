@@ -0,0 +1,333 @@
+import time
+import threading
+import functools
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+import requests
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised instead of calling an upstream that is known to be failing or has no capacity left
+    """
+
+    def __init__(self, name, reason, retry_after=None):
+        super().__init__(f"{name} unavailable: {reason}")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """
+    Raised instead of calling an upstream once the caller's latency budget is spent
+    """
+
+    def __init__(self, name):
+        super().__init__(name, 'latency budget exhausted')
+
+# Monotonic time by which the current webhook has to be done with outbound calls; a context
+# variable so fanout threads working for the webhook see the same deadline
+_deadline = contextvars.ContextVar('deadline', default=None)
+
+def current_deadline():
+    return _deadline.get()
+
+def remaining_budget():
+    """
+    Seconds left in the current latency budget, or None outside of one
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+@contextmanager
+def deadline_at(deadline):
+    """
+    Run the enclosed calls under an absolute deadline; an enclosing earlier deadline still applies
+    """
+    current = _deadline.get()
+    if deadline is None or (current is not None and current <= deadline):
+        yield
+        return
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def latency_budget(seconds):
+    """
+    Give the enclosed calls `seconds` in total to finish their outbound requests
+    """
+    return deadline_at(time.monotonic() + seconds)
+
+def with_latency_budget(seconds):
+    """
+    Decorator running each call of the function under its own latency budget
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with latency_budget(seconds):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def check_deadline(name):
+    """
+    Raise DeadlineExceeded when the current budget is spent
+    """
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(name)
+
+def budget_timeout(name, timeout):
+    """
+    Cut a request timeout down to what is left of the budget.
+    Returns (timeout, clamped), clamped being True when the budget rather than timeout set the limit.
+    """
+    remaining = remaining_budget()
+    if remaining is None:
+        return timeout, False
+    if remaining <= 0:
+        raise DeadlineExceeded(name)
+    if timeout is None or remaining < timeout:
+        return remaining, True
+    return timeout, False
+
+def wait_within_budget(future, name):
+    """
+    Wait for a future's result for no longer than the remaining budget. Only for calls that are
+    safe to abandon, such as lookups; the call itself keeps running to its own deadline.
+    """
+    remaining = remaining_budget()
+    try:
+        return future.result(timeout=None if remaining is None else max(0.0, remaining))
+    except FutureTimeoutError:
+        raise DeadlineExceeded(name)
+
+class TokenBucket:
+    """
+    Allow `rate` calls per second on average, with bursts of up to `burst`
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=0.0):
+        """
+        Take a token, waiting up to timeout seconds for one. Returns False if none came in time.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate if self.rate > 0 else timeout
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """
+    Stop calling an upstream after `failure_threshold` consecutive failures. After
+    `reset_timeout` seconds one trial call is let through: success closes the breaker
+    again, failure keeps it open for another reset_timeout.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+        self.trial_running = False
+        self.stats = {'calls': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() >= self.opened_until:
+                self.state = self.HALF_OPEN
+                self.trial_running = False
+
+            if self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self.trial_running):
+                self.trial_running = self.state == self.HALF_OPEN
+                self.stats['calls'] += 1
+                return True
+
+            self.stats['rejected'] += 1
+            return False
+
+    def retry_after(self):
+        with self._lock:
+            return max(0.0, self.opened_until - time.monotonic()) if self.state == self.OPEN else 0.0
+
+    def cancel(self):
+        """
+        The allowed call never reached the upstream; give up a half-open trial without judging it
+        """
+        with self._lock:
+            self.trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial_running = False
+
+    def record_failure(self, open_for=None):
+        """
+        Count a failed call; open_for (e.g. a 429's Retry-After) opens the breaker straight away
+        for that long instead of reset_timeout
+        """
+        with self._lock:
+            self.failures += 1
+            self.stats['failures'] += 1
+            self.trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold or open_for:
+                if self.state != self.OPEN:
+                    self.stats['opened'] += 1
+                self.state = self.OPEN
+                self.opened_until = time.monotonic() + (open_for or self.reset_timeout)
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = dict(self.stats)
+            snapshot['state'] = self.state
+            snapshot['open'] = int(self.state != self.CLOSED)
+            snapshot['consecutive_failures'] = self.failures
+            return snapshot
+
+def raise_for_upstream_status(response):
+    """
+    Raise HTTPError for a 429 or 5xx response, so the breaker counts it, and let other statuses through
+    """
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+
+def failure_retry_after(error):
+    """
+    Whether an exception means the upstream itself is struggling, and for how long it asked us
+    to back off. Timeouts, connection errors, 429 and 5xx count; other 4xx are the request's fault.
+    Returns (is_failure, retry_after_seconds).
+    """
+    if not isinstance(error, requests.exceptions.RequestException):
+        return False, None
+    response = error.response
+    if response is None:
+        return True, None
+    if response.status_code == 429:
+        try:
+            return True, float(response.headers.get('Retry-After', ''))
+        except ValueError:
+            return True, None
+    return response.status_code >= 500, None
+
+class HostPolicy:
+    """
+    Politeness and failure isolation for one upstream: a bulkhead of at most `concurrency`
+    requests in flight, optionally `rate` requests per second, and a circuit breaker
+    """
+
+    def __init__(self, name, concurrency, failure_threshold, reset_timeout, max_wait, rate=None, burst=None):
+        self.name = name
+        self.max_wait = max_wait
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst or 1) if rate else None
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.waits = {'no_slot': 0, 'no_token': 0, 'deadline': 0}
+        self._waits_lock = threading.Lock()
+
+    @contextmanager
+    def guard(self, max_wait=None):
+        """
+        Run the enclosed call under this upstream's limits, raising UpstreamUnavailable straight away
+        when the breaker is open or no slot or token frees up within max_wait (the policy's own by
+        default) or the latency budget
+        """
+        check_deadline(self.name)
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(self.name, 'circuit open', self.breaker.retry_after())
+
+        max_wait = self.max_wait if max_wait is None else max_wait
+        remaining = remaining_budget()
+        if remaining is not None:
+            max_wait = max(0.0, min(max_wait, remaining))
+        if not self.slots.acquire(timeout=max_wait):
+            self._count_wait('no_slot')
+            self.breaker.cancel()
+            raise UpstreamUnavailable(self.name, 'too many concurrent requests')
+
+        try:
+            if self.bucket and not self.bucket.acquire(timeout=max_wait):
+                self._count_wait('no_token')
+                self.breaker.cancel()
+                raise UpstreamUnavailable(self.name, 'rate limit')
+            try:
+                yield
+            except UpstreamUnavailable:
+                # Our own budget ran out; says nothing about the upstream
+                self._count_wait('deadline')
+                self.breaker.cancel()
+                raise
+            except Exception as e:
+                failed, retry_after = failure_retry_after(e)
+                if failed:
+                    self.breaker.record_failure(retry_after)
+                else:
+                    self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+        finally:
+            self.slots.release()
+
+    def _count_wait(self, reason):
+        with self._waits_lock:
+            self.waits[reason] += 1
+
+    def snapshot(self):
+        snapshot = self.breaker.snapshot()
+        with self._waits_lock:
+            snapshot.update(self.waits)
+        return snapshot
+
+class HostPolicies:
+    """
+    HostPolicy per host, created on first use with the same limits; the least recently used
+    hosts are dropped beyond max_hosts
+    """
+
+    def __init__(self, max_hosts=200, **limits):
+        self.max_hosts = max_hosts
+        self.limits = limits
+        self._policies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        with self._lock:
+            policy = self._policies.get(host)
+            if policy is None:
+                policy = self._policies[host] = HostPolicy(host, **self.limits)
+                while len(self._policies) > self.max_hosts:
+                    self._policies.popitem(last=False)
+            else:
+                self._policies.move_to_end(host)
+            return policy
+
+    def snapshot(self):
+        with self._lock:
+            policies = list(self._policies.items())
+        return {host: policy.snapshot() for host, policy in policies}
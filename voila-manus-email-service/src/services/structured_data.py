@@ -0,0 +1,239 @@
+import re
+import json
+import html
+
+JSON_LD_PATTERN = re.compile(
+    r'<script[^>]*type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+META_TAG_PATTERN = re.compile(r'<meta\s[^>]*>', re.IGNORECASE)
+META_ATTR_PATTERN = re.compile(r'([a-zA-Z_:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+# schema.org types that describe the listed property itself
+PROPERTY_SCHEMA_TYPES = {
+    'realestatelisting', 'product', 'offer', 'residence', 'accommodation', 'house',
+    'singlefamilyresidence', 'apartment', 'apartmentcomplex', 'gatedresidencecommunity',
+    'place', 'landmarksorhistoricalbuildings'
+}
+
+SCHEMA_PROPERTY_TYPES = {
+    'apartment': 'apartment',
+    'apartmentcomplex': 'apartment',
+    'singlefamilyresidence': 'residential_home',
+    'house': 'residential_home'
+}
+
+CURRENCY_SYMBOLS = {'USD': '$', 'CAD': '$', 'AUD': '$', 'NZD': '$'}
+
+AMENITY_FEATURES = ['pool', 'fireplace', 'garden', 'balcony']
+
+# UN/CEFACT codes schema.org uses in QuantitativeValue.unitCode
+AREA_UNITS = {'MTK': 'm²', 'FTK': 'sq ft'}
+
+def _decode(content):
+    if isinstance(content, (bytes, bytearray)):
+        return bytes(content).decode('utf-8', errors='replace')
+    return content
+
+def _text(value):
+    """
+    The text of a JSON-LD value, which may also be a list of values or a node such as
+    {"@value": ...}; None when there is none
+    """
+    if isinstance(value, list):
+        return _first(value, _text)
+    if isinstance(value, dict):
+        return _text(value.get('@value') or value.get('name'))
+    if value is None or isinstance(value, bool):
+        return None
+    text = str(value).strip()
+    return text or None
+
+def _iter_nodes(data):
+    if isinstance(data, list):
+        for item in data:
+            yield from _iter_nodes(item)
+    elif isinstance(data, dict):
+        yield data
+        for key in ('@graph', 'mainEntity', 'itemOffered', 'offers', 'about'):
+            if key in data:
+                yield from _iter_nodes(data[key])
+
+def _types(node):
+    node_type = node.get('@type', [])
+    if isinstance(node_type, str):
+        node_type = [node_type]
+    return [str(t).lower() for t in node_type]
+
+def _schema_property_type(node):
+    for node_type in _types(node):
+        if node_type in SCHEMA_PROPERTY_TYPES:
+            return SCHEMA_PROPERTY_TYPES[node_type]
+    return None
+
+def _first(nodes, getter):
+    for node in nodes:
+        value = getter(node)
+        if value:
+            return value
+    return None
+
+def _format_price(amount, currency):
+    try:
+        number = float(str(amount).replace(',', ''))
+    except ValueError:
+        return str(amount)
+
+    formatted = f"{int(number):,}" if number.is_integer() else f"{number:,.2f}"
+    symbol = CURRENCY_SYMBOLS.get((currency or 'USD').upper())
+    return f"{symbol}{formatted}" if symbol else f"{formatted} {currency}"
+
+def _format_address(address):
+    if isinstance(address, list):
+        return _first(address, _format_address)
+    if not isinstance(address, dict):
+        return _text(address)
+
+    street = _text(address.get('streetAddress'))
+    locality = _text(address.get('addressLocality'))
+    region_postal = ' '.join(
+        part for part in [_text(address.get('addressRegion')), _text(address.get('postalCode'))] if part
+    )
+    parts = [part for part in [street, locality, region_postal] if part]
+    return ', '.join(parts) if parts else None
+
+def _offer_price(node):
+    offers = node.get('offers')
+    if isinstance(offers, list):
+        offers = offers[0] if offers else None
+    if isinstance(offers, dict) and offers.get('price'):
+        return _format_price(offers['price'], offers.get('priceCurrency'))
+    if 'offer' in _types(node) and node.get('price'):
+        return _format_price(node['price'], node.get('priceCurrency'))
+    return None
+
+def _quantity(value):
+    if isinstance(value, dict):
+        value = value.get('value')
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else number
+
+def _floor_size(value):
+    """
+    Format a floorSize in the unit it was given in; square feet unless unitCode or unitText says otherwise
+    """
+    size = _quantity(value)
+    if not size:
+        return None
+    unit = 'sq ft'
+    if isinstance(value, dict):
+        code = _text(value.get('unitCode'))
+        unit = AREA_UNITS.get(code.upper(), code) if code else _text(value.get('unitText')) or unit
+    return f"{size:,} {unit}"
+
+def _features(nodes):
+    features = []
+    # numberOfRooms counts every room, so it is only shown as rooms
+    bedrooms = _first(nodes, lambda n: _quantity(n.get('numberOfBedrooms')))
+    rooms = None if bedrooms else _first(nodes, lambda n: _quantity(n.get('numberOfRooms')))
+    bathrooms = _first(nodes, lambda n: _quantity(n.get('numberOfBathroomsTotal')) or _quantity(n.get('numberOfFullBathrooms')))
+    floor_size = _first(nodes, lambda n: _floor_size(n.get('floorSize')))
+
+    if bedrooms:
+        features.append(f"{bedrooms} bedrooms")
+    if rooms:
+        features.append(f"{rooms} rooms")
+    if bathrooms:
+        features.append(f"{bathrooms} bathrooms")
+    if floor_size:
+        features.append(floor_size)
+
+    amenities = []
+    for node in nodes:
+        amenity_feature = node.get('amenityFeature') or []
+        for amenity in amenity_feature if isinstance(amenity_feature, list) else [amenity_feature]:
+            amenities.append(_text(amenity) or '')
+    amenity_text = ' '.join(amenities).lower()
+    description_text = ' '.join(_text(node.get('description')) or '' for node in nodes).lower()
+    for amenity in AMENITY_FEATURES:
+        if amenity in amenity_text or amenity in description_text:
+            features.append(amenity)
+
+    return features[:5]
+
+def parse_meta_tags(text):
+    """
+    Map OpenGraph/product meta properties to their content
+    """
+    meta = {}
+    for tag in META_TAG_PATTERN.findall(text):
+        attrs = {name.lower(): html.unescape(double or single) for name, double, single in META_ATTR_PATTERN.findall(tag)}
+        key = attrs.get('property') or attrs.get('name')
+        if key and 'content' in attrs and key not in meta:
+            meta[key] = attrs['content'].strip()
+    return meta
+
+def parse_json_ld(text):
+    """
+    Decode every JSON-LD block, skipping malformed ones
+    """
+    blocks = []
+    for raw in JSON_LD_PATTERN.findall(text):
+        try:
+            blocks.append(json.loads(raw.strip()))
+        except ValueError:
+            continue
+    return blocks
+
+def extract_structured_data(content):
+    """
+    Read a partial property info dict from schema.org JSON-LD and OpenGraph tags.
+    Only fields that were found are present in the result.
+    """
+    text = _decode(content)
+    nodes = [
+        node for block in parse_json_ld(text) for node in _iter_nodes(block)
+        if set(_types(node)) & PROPERTY_SCHEMA_TYPES
+    ]
+    meta = parse_meta_tags(text)
+
+    info = {}
+
+    title = _first(nodes, lambda n: _text(n.get('name'))) or meta.get('og:title')
+    if title:
+        info['title'] = title.strip()
+
+    price = _first(nodes, _offer_price)
+    if not price and meta.get('product:price:amount'):
+        price = _format_price(meta['product:price:amount'], meta.get('product:price:currency'))
+    if price:
+        info['price'] = price
+
+    location = _first(nodes, lambda n: _format_address(n.get('address')))
+    if location:
+        info['location'] = location
+
+    schema_type = _first(nodes, _schema_property_type)
+    if schema_type:
+        info['type'] = schema_type
+
+    if nodes:
+        features = _features(nodes)
+        if features:
+            info['features'] = features
+
+    description = _first(nodes, lambda n: _text(n.get('description'))) or meta.get('og:description')
+    if description and len(description.strip()) > 50:
+        description = description.strip()
+        info['description'] = description[:500] + '...' if len(description) > 500 else description
+
+    return info
+
+def is_complete(structured_info):
+    """
+    True when structured data alone is enough to skip the DOM heuristics
+    """
+    return all(structured_info.get(field) for field in ('title', 'price', 'location'))
@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Configure the app before it is imported: a throwaway SQLite database
+os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(prefix='voila-tests-'), 'app.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from src.main import app, db
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
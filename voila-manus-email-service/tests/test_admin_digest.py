@@ -0,0 +1,41 @@
+import pytest
+from src.models.job import Job
+from src.models.order_record import OrderRecord
+from src.models.user import db
+from src.routes import email_service
+from src.services import admin_digest
+
+def test_digest_is_queued_once_per_due_time(app, monkeypatch):
+    monkeypatch.setattr(admin_digest, 'ADMIN_NOTIFICATION_MODE', 'batched')
+
+    job = admin_digest.schedule_admin_digest()
+    assert job is not None
+
+    # Another worker that missed the queued job (here: it was already claimed) must not queue a second one
+    job.status = 'running'
+    db.session.commit()
+    assert admin_digest.schedule_admin_digest() is None
+    assert Job.query.filter_by(job_type=admin_digest.DIGEST_JOB_TYPE).count() == 1
+
+def test_failed_admin_notification_is_retried_by_the_job_queue(app, monkeypatch):
+    db.session.add(OrderRecord(order_id='order-1', customer_name='Ann', customer_email='ann@example.com',
+                               property_title='Flat', property_url='https://example.com/1'))
+    db.session.commit()
+    responses = [{'success': False, 'error': 'Resend unavailable'}, {'success': True, 'message_id': 'm1'}]
+    sent = []
+
+    def fake_send(**kwargs):
+        sent.append(kwargs['idempotency_key'])
+        return responses.pop(0)
+
+    monkeypatch.setattr(email_service, 'send_email_via_resend', fake_send)
+    payload = {'order_id': 'order-1', 'subject': 'New order', 'html_content': '<p>New order</p>'}
+
+    with pytest.raises(Exception, match='Resend unavailable'):
+        email_service.process_admin_notification(payload)
+    assert OrderRecord.query.filter_by(order_id='order-1').one().admin_notified_at is None
+
+    result = email_service.process_admin_notification(payload)
+    assert result['resend_message_id'] == 'm1'
+    assert sent == ['order-1:admin_notification'] * 2
+    assert OrderRecord.query.filter_by(order_id='order-1').one().admin_notified_at is not None
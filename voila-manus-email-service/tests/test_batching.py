@@ -0,0 +1,42 @@
+from src.models.email_log import EmailLog
+from src.services.email_dispatcher import EmailDispatcher
+from src.services.log_writer import EmailLogWriter
+
+def test_dispatcher_batches_messages_in_one_window():
+    batches = []
+    dispatcher = EmailDispatcher(
+        send_one=lambda payload: {'success': True, 'message_id': 'single'},
+        send_batch=lambda payloads: batches.append(payloads) or [{'success': True, 'message_id': p['to']} for p in payloads],
+        window_ms=200
+    )
+    futures = [dispatcher.send({'to': f'user{index}@example.com'}) for index in range(3)]
+
+    assert [future.result(timeout=5)['message_id'] for future in futures] == [
+        'user0@example.com', 'user1@example.com', 'user2@example.com'
+    ]
+    assert len(batches) == 1
+    assert dispatcher.stats()['batched_messages'] == 3
+
+def test_dispatcher_stop_sends_queued_messages():
+    dispatcher = EmailDispatcher(
+        send_one=lambda payload: {'success': True, 'message_id': payload['to']},
+        send_batch=lambda payloads: [{'success': True, 'message_id': p['to']} for p in payloads],
+        window_ms=10000
+    )
+    futures = [dispatcher.send({'to': 'a@example.com'}), dispatcher.send({'to': 'b@example.com'})]
+    dispatcher.stop(timeout=5)
+
+    assert all(future.done() for future in futures)
+    assert futures[1].result()['message_id'] == 'b@example.com'
+
+def test_log_writer_group_commits_and_drains_on_stop(app):
+    writer = EmailLogWriter(app, flush_ms=10000)
+    fields = {'order_id': 'o1', 'customer_email': 'a@example.com', 'customer_name': 'Ann',
+              'property_title': 'Flat', 'email_subject': 'Hi', 'email_type': 'order_confirmation', 'status': 'sent'}
+    futures = [writer.write('<p>one</p>', 'order_confirmation', fields),
+               writer.write('<p>two</p>', 'video_completion', dict(fields, email_type='video_completion'))]
+    writer.stop(timeout=5)
+
+    assert all(future.done() for future in futures)
+    assert EmailLog.query.count() == 2
+    assert writer.stats()['commits'] == 1
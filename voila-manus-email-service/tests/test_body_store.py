@@ -0,0 +1,48 @@
+import threading
+from src.models.email_body import EmailBody, EmailBodyDictionary
+from src.models.user import db
+from src.services import body_store
+from src.services.body_store import store_email_body
+
+def body(name):
+    return f'<html><body><h1>Your video is ready, {name}!</h1><p>{"Thanks for ordering. " * 20}</p></body></html>'
+
+def test_round_trip_uses_dictionary(app):
+    body_store._dictionaries.clear()
+    first = store_email_body(body('Ann'), 'video_completion')
+    second = store_email_body(body('Bob'), 'video_completion')
+    db.session.commit()
+
+    assert db.session.get(EmailBody, first).html == body('Ann')
+    assert db.session.get(EmailBody, second).html == body('Bob')
+    assert db.session.get(EmailBody, second).dictionary_id is not None
+    assert 'video_completion' in body_store._dictionaries
+
+def test_rolled_back_dictionary_is_not_reused(app):
+    body_store._dictionaries.clear()
+    store_email_body(body('Ann'), 'video_completion')
+    # A second body in the same transaction finds the flushed dictionary row
+    store_email_body(body('Bob'), 'video_completion')
+    db.session.rollback()
+
+    assert db.session.query(EmailBodyDictionary).count() == 0
+    assert 'video_completion' not in body_store._dictionaries
+
+    body_hash = store_email_body(body('Cid'), 'video_completion')
+    db.session.commit()
+
+    stored = db.session.get(EmailBody, body_hash)
+    assert db.session.get(EmailBodyDictionary, stored.dictionary_id) is not None
+    assert stored.html == body('Cid')
+
+def test_migrate_email_bodies_command_starts_no_background_services(app, monkeypatch):
+    from src import main
+
+    monkeypatch.delenv('START_BACKGROUND_SERVICES', raising=False)
+    result = app.test_cli_runner().invoke(args=['migrate-email-bodies'])
+
+    assert result.exit_code == 0, result.output
+    assert 'Migrated 0 email logs' in result.output
+    assert main.job_workers is None
+    assert not [thread for thread in threading.enumerate()
+                if thread.name.startswith('job-worker') or thread.name == 'email-retry']
@@ -0,0 +1,99 @@
+import json
+import pytest
+import requests
+from src.routes import email_service
+from src.services.identity_cache import identity_cache, NOT_FOUND
+from src.services.resilience import HostPolicy
+
+USER_ID = '6f1c2a9e-0000-4000-8000-000000000001'
+
+def response(status, body):
+    result = requests.Response()
+    result.status_code = status
+    result._content = json.dumps(body).encode()
+    result.url = 'https://supabase.test'
+    return result
+
+@pytest.fixture
+def supabase(monkeypatch):
+    """
+    Answer auth and profiles requests with the statuses the test sets
+    """
+    statuses = {'auth': 200, 'profiles': 200}
+
+    def fake_get(url, **kwargs):
+        if '/auth/v1/' in url:
+            if statuses['auth'] == 200:
+                return response(200, {'email': 'ann@example.com', 'user_metadata': {'full_name': 'Ann'}})
+            return response(statuses['auth'], {'message': 'error'})
+        if statuses['profiles'] == 200:
+            return response(200, [{'user_id': USER_ID, 'email': 'ann@profiles.example.com', 'full_name': 'Ann P'}])
+        if statuses['profiles'] == 404:
+            return response(200, [])
+        return response(statuses['profiles'], {'message': 'error'})
+
+    monkeypatch.setattr(email_service, 'http_get', fake_get)
+    monkeypatch.setattr(email_service, 'supabase_upstream', HostPolicy('supabase', 8, 100, 30, 2))
+    monkeypatch.setattr(email_service, '_auth_refused_until', 0.0)
+    identity_cache.clear()
+    yield statuses
+    identity_cache.clear()
+
+@pytest.mark.parametrize('status', [500, 503, 429])
+def test_auth_failure_falls_back_to_profiles(supabase, status):
+    supabase['auth'] = status
+    assert email_service.fetch_customer_data(USER_ID) == {'email': 'ann@profiles.example.com', 'name': 'Ann P'}
+
+def test_transient_failure_is_not_cached_as_missing(supabase):
+    supabase['auth'] = 503
+    supabase['profiles'] = 503
+    with pytest.raises(requests.exceptions.HTTPError):
+        email_service.fetch_customer_data(USER_ID)
+    assert identity_cache.get(USER_ID) is None
+
+    # Once Supabase recovers the customer is found straight away
+    supabase['auth'] = 200
+    assert email_service.fetch_customer_data(USER_ID)['email'] == 'ann@example.com'
+
+def test_auth_failure_without_profile_is_not_cached_as_missing(supabase):
+    supabase['auth'] = 500
+    supabase['profiles'] = 404
+    with pytest.raises(requests.exceptions.HTTPError):
+        email_service.fetch_customer_data(USER_ID)
+    assert identity_cache.get(USER_ID) is None
+
+def test_missing_user_is_cached_as_missing(supabase):
+    supabase['auth'] = 404
+    supabase['profiles'] = 404
+    assert email_service.fetch_customer_data(USER_ID) is None
+    assert identity_cache.get(USER_ID) is NOT_FOUND
+
+def test_invalidation_from_another_worker_is_applied(app, supabase, monkeypatch):
+    from datetime import datetime
+    from src.models.customer_cache_invalidation import CustomerCacheInvalidation
+    from src.models.user import db
+    from src.services import identity_cache as cache_module
+
+    assert email_service.fetch_customer_data(USER_ID)['email'] == 'ann@example.com'
+    supabase['auth'] = 404
+    # Still served from this worker's cache
+    monkeypatch.setattr(cache_module, '_next_invalidation_poll', float('inf'))
+    assert email_service.fetch_customer_data(USER_ID)['email'] == 'ann@example.com'
+
+    # Another worker handles DELETE /customers/<id>/cache
+    db.session.add(CustomerCacheInvalidation(user_id=USER_ID, invalidated_at=datetime.utcnow()))
+    db.session.commit()
+    monkeypatch.setattr(cache_module, '_next_invalidation_poll', 0.0)
+
+    assert email_service.fetch_customer_data(USER_ID)['email'] == 'ann@profiles.example.com'
+    assert cache_module.get_identity_cache_stats()['invalidations_applied'] >= 1
+
+def test_invalidate_route_records_the_invalidation(app, supabase):
+    from src.models.customer_cache_invalidation import CustomerCacheInvalidation
+    from src.models.user import db
+
+    email_service.fetch_customer_data(USER_ID)
+    client = app.test_client()
+    assert client.delete(f'/api/customers/{USER_ID}/cache').get_json()['invalidated'] is True
+    assert client.delete(f'/api/customers/{USER_ID}/cache').get_json()['invalidated'] is False
+    assert db.session.query(CustomerCacheInvalidation).filter_by(user_id=USER_ID).count() == 1
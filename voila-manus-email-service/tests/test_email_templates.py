@@ -0,0 +1,19 @@
+import os
+import pytest
+from benchmarks.bench_templates import normalize, renderers
+from src.routes import email_service
+
+EXPECTED_DIR = os.path.join(os.path.dirname(__file__), 'emails')
+
+# The <body> each email rendered to before the templates replaced the f-string builders
+@pytest.mark.parametrize('name', sorted(renderers(email_service)))
+def test_email_body_matches_pinned_output(name):
+    with open(os.path.join(EXPECTED_DIR, f'{name}.html'), encoding='utf-8') as expected:
+        assert normalize(renderers(email_service)[name]()) == expected.read().strip()
+
+def test_values_are_escaped():
+    html = email_service.generate_professional_html_email(
+        '<b>Ann</b>', 'Flat & <script>alert(1)</script>', '<p>Hello</p>', 'Premium Video Package')
+
+    assert '<script>' not in html
+    assert '&lt;script&gt;' in html
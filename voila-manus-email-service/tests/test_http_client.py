@@ -0,0 +1,47 @@
+from src.services import http_client, metrics
+from src.services.http_client import http_get
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+def test_session_evicted_while_in_use_is_closed_by_its_last_user(monkeypatch):
+    monkeypatch.setattr(http_client, 'HTTP_MAX_SESSIONS', 1)
+    monkeypatch.setattr(http_client, '_create_session', FakeSession)
+    monkeypatch.setattr(http_client, '_sessions', http_client.OrderedDict())
+    monkeypatch.setattr(http_client, '_request_counts', {})
+
+    busy = http_client._acquire('https://a.example/listing/1')
+    idle = http_client.get_session('https://b.example/listing/2')
+    assert not busy.closed
+    assert 'https://a.example' not in http_client._request_counts
+
+    http_client._release(busy)
+    assert busy.closed
+
+    http_client.get_session('https://c.example/listing/3')
+    assert idle.closed
+
+def test_listing_requests_share_one_metrics_label(monkeypatch):
+    class Response:
+        status_code = 200
+
+    class Session(FakeSession):
+        def request(self, method, url, **kwargs):
+            return Response()
+
+    monkeypatch.setattr(http_client, '_create_session', Session)
+    monkeypatch.setattr(http_client, '_sessions', http_client.OrderedDict())
+    monkeypatch.setattr(metrics, '_histograms', {})
+    monkeypatch.setattr(metrics, '_counters', {})
+
+    for host in ('one.example', 'two.example', 'three.example'):
+        http_get(f'https://{host}/listing', upstream='listing')
+
+    assert list(metrics._counters.values()) == [3]
+    (name, labels), = metrics._histograms.keys()
+    assert name == 'voila_upstream_request_duration_seconds'
+    assert dict(labels) == {'host': 'listing'}
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from src.models.idempotency_key import IdempotencyKey
+from src.models.user import db
+from src.services.idempotency import claim_idempotency_key, complete_idempotency_key, prune_idempotency_keys
+
+def test_duplicate_delivery_is_answered_without_writing(app):
+    assert claim_idempotency_key('new_order:1') is None
+    complete_idempotency_key('new_order:1', {'success': True}, 202)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement.split()[0].upper())
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        existing = claim_idempotency_key('new_order:1')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert existing.status == 'done' and existing.response_data == {'success': True}
+    assert statements == ['SELECT']
+
+def test_expired_in_flight_key_is_taken_over(app):
+    db.session.add(IdempotencyKey(key='new_order:2', status='in_flight',
+                                  locked_until=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+
+    assert claim_idempotency_key('new_order:2') is None
+    assert claim_idempotency_key('new_order:2').status == 'in_flight'
+
+def test_old_keys_are_pruned(app):
+    old = datetime.utcnow() - timedelta(days=8)
+    db.session.add(IdempotencyKey(key='new_order:old', status='done', created_at=old, updated_at=old))
+    db.session.add(IdempotencyKey(key='new_order:new', status='done'))
+    db.session.commit()
+
+    assert prune_idempotency_keys(retention_days=7) == 1
+    assert [key.key for key in IdempotencyKey.query.all()] == ['new_order:new']
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+from src.models.job import Job
+from src.models.user import db
+from src.services import job_queue
+from src.services.job_queue import JobWorkerPool, prune_finished_jobs
+
+def add_job(status, started_ago=None, finished_ago=None):
+    now = datetime.utcnow()
+    job = Job(job_type='noop', payload='{}', status=status,
+              started_at=now - started_ago if started_ago is not None else None,
+              finished_at=now - finished_ago if finished_ago is not None else None)
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+def test_prune_finished_jobs_keeps_recent_and_unfinished(app):
+    add_job('succeeded', finished_ago=timedelta(days=8))
+    add_job('failed', finished_ago=timedelta(days=8))
+    recent_done = add_job('succeeded', finished_ago=timedelta(days=1))
+    queued = add_job('queued')
+
+    assert prune_finished_jobs(retention_days=7) == 2
+    assert {job.id for job in Job.query.all()} == {recent_done, queued}
+
+def test_running_pool_requeues_jobs_that_go_stale(app, monkeypatch):
+    monkeypatch.setattr(job_queue, 'JOB_SWEEP_INTERVAL', 0)
+    monkeypatch.setattr(job_queue, 'JOB_STALE_AFTER', 60)
+    job_queue.register_job_handler('noop', lambda payload, report_progress: {'ok': True})
+    # Left running by a worker that was killed; not stale yet when the new pool starts
+    job_id = add_job('running', started_ago=timedelta(seconds=30))
+
+    pool = JobWorkerPool(app, size=1, poll_interval=0.05)
+    pool.start()
+    try:
+        assert db.session.get(Job, job_id).status == 'running'
+        db.session.get(Job, job_id).started_at -= timedelta(seconds=60)
+        db.session.commit()
+
+        for _ in range(100):
+            db.session.expire_all()
+            if db.session.get(Job, job_id).status == 'succeeded':
+                break
+            job_queue._wakeup.wait(0.05)
+        assert db.session.get(Job, job_id).status == 'succeeded'
+    finally:
+        pool.stop(timeout=5)
@@ -0,0 +1,62 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.services import listing_fetcher
+from src.services.listing_fetcher import fetch_listing_page
+from src.services.resilience import latency_budget
+
+PAGE = b'<html><head><title>Sea view flat</title></head><body>' + b'x' * 200 + b'</body></html>'
+
+class ListingHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        if self.path == '/drip':
+            # One byte at a time: never idle long enough for the per-read timeout
+            try:
+                for byte in PAGE:
+                    self.wfile.write(bytes([byte]))
+                    self.wfile.flush()
+                    time.sleep(0.2)
+            except OSError:
+                pass
+        else:
+            self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def listing_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ListingHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+def test_fetch_reads_whole_page(listing_server):
+    page = fetch_listing_page(f'{listing_server}/fast', stop_after_head=None)
+
+    assert page.content == PAGE
+    assert not page.truncated
+
+def test_dripping_host_is_cut_off_at_latency_budget(listing_server):
+    start = time.monotonic()
+    with latency_budget(1):
+        page = fetch_listing_page(f'{listing_server}/drip')
+
+    assert time.monotonic() - start < 2
+    assert page.truncated
+    assert PAGE.startswith(page.content) and 0 < len(page.content) < len(PAGE)
+
+def test_dripping_host_is_cut_off_without_budget(listing_server, monkeypatch):
+    monkeypatch.setattr(listing_fetcher, 'PROPERTY_FETCH_TOTAL_TIMEOUT', 1)
+    start = time.monotonic()
+    page = fetch_listing_page(f'{listing_server}/drip')
+
+    assert time.monotonic() - start < 2
+    assert page.truncated
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import inspect, text
+from src.models.email_log import EmailLog
+from src.models.migrations import MissingUniqueIndex, ensure_indexes
+from src.models.user import db
+
+def add_log(order_id, email_type, status, minutes_ago):
+    log = EmailLog(order_id=order_id, customer_email='a@example.com', customer_name='Ann', property_title='Flat',
+                   email_subject='Hi', email_type=email_type, status=status,
+                   created_at=datetime.utcnow() - timedelta(minutes=minutes_ago))
+    db.session.add(log)
+    db.session.commit()
+    return log.id
+
+@pytest.fixture
+def duplicated_logs(app):
+    """
+    A database from before the unique index, already holding duplicate sends
+    """
+    db.session.execute(text('DROP INDEX uq_email_logs_order_id_email_type'))
+    db.session.commit()
+    return {
+        'first': add_log('o1', 'order_confirmation', 'failed', 30),
+        'kept': add_log('o1', 'order_confirmation', 'sent', 20),
+        'later': add_log('o1', 'order_confirmation', 'sent', 10),
+        'other': add_log('o1', 'video_completion', 'failed', 5)
+    }
+
+def test_startup_fails_without_deleting_duplicates(duplicated_logs):
+    with pytest.raises(MissingUniqueIndex, match='dedupe-email-logs'):
+        ensure_indexes()
+
+    assert EmailLog.query.count() == 4
+
+def test_dedupe_command_keeps_the_earliest_sent_log_and_builds_the_index(app, duplicated_logs):
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['dedupe-email-logs', '--dry-run'])
+    assert '2 duplicate email logs would be removed' in result.output
+    assert EmailLog.query.count() == 4
+
+    result = runner.invoke(args=['dedupe-email-logs'])
+    assert result.exit_code == 0, result.output
+
+    db.session.expire_all()
+    assert sorted(log.id for log in EmailLog.query.all()) == sorted([duplicated_logs['kept'], duplicated_logs['other']])
+    indexes = {index['name']: index for index in inspect(db.engine).get_indexes('email_logs')}
+    assert indexes['uq_email_logs_order_id_email_type']['unique']
@@ -0,0 +1,106 @@
+import csv
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import pytest
+from src.routes import email_service
+from src.services.profile_resolver import ProfileResolver
+
+PROFILES = {
+    '6f1c2a9e-0000-4000-8000-000000000001': {'email': 'ann@example.com', 'full_name': 'Ann'},
+    '6f1c2a9e-0000-4000-8000-000000000002': {'email': 'bob@example.com', 'name': 'Bob'},
+}
+
+class PostgrestStub(BaseHTTPRequestHandler):
+    """
+    Enough of PostgREST's /rest/v1/profiles for user_id=eq. and user_id=in.(...) filters.
+    Like Postgres, a value that isn't a UUID fails the whole query with a 400.
+    """
+
+    queries = []
+    requested = []
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        user_filter = parse_qs(parts.query)['user_id'][0]
+        PostgrestStub.queries.append(user_filter)
+
+        operator, _, value = user_filter.partition('.')
+        if operator == 'eq':
+            user_ids = [value]
+        else:
+            assert value.startswith('(') and value.endswith(')')
+            user_ids = next(csv.reader([value[1:-1]], escapechar='\\'))
+        PostgrestStub.requested.append(user_ids)
+
+        if any(user_id.lower() not in PROFILES and len(user_id) != 36 for user_id in user_ids):
+            return self._send(400, {'code': '22P02', 'message': 'invalid input syntax for type uuid'})
+        rows = [dict(PROFILES[user_id.lower()], user_id=user_id.lower())
+                for user_id in user_ids if user_id.lower() in PROFILES]
+        self._send(200, rows)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def postgrest(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PostgrestStub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    PostgrestStub.queries = []
+    PostgrestStub.requested = []
+    monkeypatch.setattr(email_service, 'SUPABASE_URL', f'http://127.0.0.1:{server.server_address[1]}')
+    yield PostgrestStub
+    server.shutdown()
+    server.server_close()
+
+def test_fetch_profiles_uses_one_quoted_in_query(postgrest):
+    first, second = PROFILES
+    profiles = email_service.fetch_profiles([first.upper(), second, '6f1c2a9e-0000-4000-8000-00000000000f'])
+
+    assert postgrest.queries == [f'in.("{first.upper()}","{second}","6f1c2a9e-0000-4000-8000-00000000000f")']
+    # Keyed by the ids as they were asked for, whatever case Postgres returns them in
+    assert profiles == {
+        first.upper(): {'email': 'ann@example.com', 'name': 'Ann'},
+        second: {'email': 'bob@example.com', 'name': 'Bob'},
+    }
+
+def test_fetch_profiles_quotes_ids_with_separators(postgrest):
+    first, _ = PROFILES
+    odd_id = 'x"y,z)'
+    email_service.fetch_profiles([first, odd_id])
+
+    # The list reaches PostgREST as the two ids, not split at the comma or closed early
+    assert postgrest.queries[0] == f'in.("{first}","x\\"y,z)")'
+    assert postgrest.requested[0] == [first, odd_id]
+
+def test_fetch_profiles_falls_back_to_single_queries(postgrest):
+    first, second = PROFILES
+    profiles = email_service.fetch_profiles([first, 'not-a-uuid', second])
+
+    assert postgrest.queries[0] == f'in.("{first}","not-a-uuid","{second}")'
+    assert postgrest.queries[1:] == [f'in.("{first}")', 'in.("not-a-uuid")', f'in.("{second}")']
+    assert set(profiles) == {first, second}
+
+def test_resolver_coalesces_lookups_into_one_query(postgrest):
+    resolver = ProfileResolver(email_service.fetch_profiles, window_ms=50)
+    first, second = PROFILES
+    futures = [resolver.resolve(user_id) for user_id in (first, second, first, '6f1c2a9e-0000-4000-8000-00000000000f')]
+
+    results = [future.result(timeout=5) for future in futures]
+
+    assert len(postgrest.queries) == 1
+    assert results[0] == results[2] == {'email': 'ann@example.com', 'name': 'Ann'}
+    assert results[1]['name'] == 'Bob'
+    assert results[3] is None
+    assert resolver.stats()['users_per_query'] == 3.0
+    resolver.stop()
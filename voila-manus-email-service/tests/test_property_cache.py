@@ -0,0 +1,22 @@
+from src.models.job import Job
+from src.models.property_cache import PropertyCacheEntry
+from src.models.user import db
+from src.services import property_cache
+from src.services.property_cache import normalize_url
+
+def test_normalize_url_strips_only_tracking_params():
+    assert normalize_url('https://Example.com:443/listing?utm_source=mail&fbclid=x&gclid=y&b=2&a=1#photos') \
+        == 'https://example.com/listing?a=1&b=2'
+    # Some sites carry the listing id in ref or source
+    assert normalize_url('https://example.com/listing?ref=12345') != normalize_url('https://example.com/listing?ref=67890')
+    assert normalize_url('https://example.com/listing?source=abc') == 'https://example.com/listing?source=abc'
+
+def test_persisting_leaves_the_callers_transaction_alone(app, monkeypatch):
+    monkeypatch.setattr(property_cache, 'PROPERTY_CACHE_PERSIST', True)
+    db.session.add(Job(job_type='example', payload='{}', status='queued'))
+
+    property_cache.store('https://example.com/listing', {'title': 'Flat'}, etag='"v1"')
+    db.session.rollback()
+
+    assert db.session.query(Job).count() == 0
+    assert db.session.query(PropertyCacheEntry).count() == 1
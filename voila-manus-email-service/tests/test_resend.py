@@ -0,0 +1,94 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+import requests
+from src.models.email_log import EmailLog
+from src.models.user import db
+from src.routes import email_service
+from src.services import email_retry
+from src.services.resilience import HostPolicy
+
+def ok(body):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(body).encode()
+    return response
+
+@pytest.fixture
+def resend(monkeypatch):
+    """
+    Record every request to Resend; a test may queue exceptions to raise instead of answering
+    """
+    calls = []
+    failures = []
+
+    def fake_post(url, json=None, headers=None, **kwargs):
+        calls.append({'url': url, 'json': json, 'headers': dict(headers)})
+        if failures:
+            raise failures.pop(0)
+        if url.endswith('/batch'):
+            return ok({'data': [{'id': f'b{index}'} for index in range(len(json))]})
+        return ok({'id': 'single'})
+
+    monkeypatch.setattr(email_service, 'http_post', fake_post)
+    monkeypatch.setattr(email_service, 'resend_upstream', HostPolicy('resend', 4, 100, 30, 2))
+    return calls, failures
+
+def payload(to, key):
+    return {'from': 'noreply@example.com', 'to': [to], 'subject': 'Hi', 'html': '<p>Hi</p>',
+            email_service.IDEMPOTENCY_KEY_FIELD: key}
+
+def test_single_send_puts_key_in_header(resend):
+    calls, _ = resend
+    result = email_service.send_single_via_resend(payload('a@example.com', 'o1:order_confirmation'))
+
+    assert result['success']
+    assert calls[0]['headers']['Idempotency-Key'] == 'o1:order_confirmation'
+    assert email_service.IDEMPOTENCY_KEY_FIELD not in calls[0]['json']
+
+def test_keyed_emails_skip_the_batch_and_keep_their_own_key(resend, monkeypatch):
+    calls, _ = resend
+    monkeypatch.setattr(email_service, 'EMAIL_BATCHING', True)
+    monkeypatch.setattr(email_service, 'RESEND_API_KEY', 're_test')
+    batched = []
+    monkeypatch.setattr(email_service.email_dispatcher, 'send', batched.append)
+
+    for order_id in ('o1', 'o2'):
+        result = email_service.send_email_via_resend(f'{order_id}@example.com', 'Hi', '<p>Hi</p>', 'Ann',
+                                                     idempotency_key=f'{order_id}:order_confirmation')
+        assert result['success']
+
+    assert batched == []
+    assert [call['url'] for call in calls] == [email_service.RESEND_EMAILS_URL] * 2
+    assert [call['headers']['Idempotency-Key'] for call in calls] == ['o1:order_confirmation', 'o2:order_confirmation']
+
+def test_retry_scheduler_resends_under_the_first_attempts_key(app, monkeypatch):
+    sent = []
+    monkeypatch.setattr(email_retry, '_sender', lambda *args, **kwargs: sent.append(kwargs) or {'success': True})
+    db.session.add(EmailLog(order_id='o1', customer_email='a@example.com', customer_name='Ann', property_title='Flat',
+                            email_subject='Hi', email_type='video_completion', status='failed', attempts=1,
+                            email_content='<p>Hi</p>', next_attempt_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+
+    assert email_retry.retry_due_emails() == 1
+    assert sent == [{'idempotency_key': 'o1:video_completion'}]
+
+def test_retries_bypass_the_dispatcher(app, resend, monkeypatch):
+    calls, _ = resend
+    monkeypatch.setattr(email_service, 'EMAIL_BATCHING', True)
+    monkeypatch.setattr(email_service, 'RESEND_API_KEY', 're_test')
+    monkeypatch.setattr(email_retry, '_sender', email_service.send_retry_via_resend)
+    batched = []
+    monkeypatch.setattr(email_service.email_dispatcher, 'send', batched.append)
+    for order_id in ('o1', 'o2'):
+        db.session.add(EmailLog(order_id=order_id, customer_email='a@example.com', customer_name='Ann',
+                                property_title='Flat', email_subject='Hi', email_type='order_confirmation',
+                                status='failed', attempts=1, email_content='<p>Hi</p>',
+                                next_attempt_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+
+    assert email_retry.retry_due_emails() == 2
+    assert batched == []
+    assert sorted(call['headers']['Idempotency-Key'] for call in calls) == ['o1:order_confirmation',
+                                                                            'o2:order_confirmation']
+    assert all(call['url'] == email_service.RESEND_EMAILS_URL for call in calls)
@@ -0,0 +1,56 @@
+import json
+from src.services.property_extractor import has_complete_structured_data
+from src.services.structured_data import extract_structured_data
+
+DESCRIPTION = 'Bright two bedroom flat with a balcony overlooking the harbour, close to the beach.'
+
+def page(*nodes):
+    scripts = ''.join(f'<script type="application/ld+json">{json.dumps(node)}</script>' for node in nodes)
+    return f'<html><head>{scripts}</head><body></body></html>'.encode()
+
+def listing(**fields):
+    node = {
+        '@type': 'Apartment',
+        'name': 'Harbour view flat',
+        'address': {'streetAddress': '1 Quay St', 'addressLocality': 'Sydney'},
+        'offers': {'@type': 'Offer', 'price': '950000', 'priceCurrency': 'AUD'},
+    }
+    node.update(fields)
+    return node
+
+def test_floor_size_in_square_metres():
+    info = extract_structured_data(page(listing(floorSize={'@type': 'QuantitativeValue', 'value': 68, 'unitCode': 'MTK'})))
+    assert '68 m²' in info['features']
+
+def test_floor_size_in_square_feet():
+    info = extract_structured_data(page(listing(floorSize={'value': 1200, 'unitCode': 'FTK'})))
+    assert '1,200 sq ft' in info['features']
+
+def test_floor_size_without_unit_defaults_to_square_feet():
+    info = extract_structured_data(page(listing(floorSize=900)))
+    assert '900 sq ft' in info['features']
+
+def test_number_of_rooms_is_not_shown_as_bedrooms():
+    info = extract_structured_data(page(listing(numberOfRooms=4)))
+    assert '4 rooms' in info['features']
+    assert not any('bedrooms' in feature for feature in info['features'])
+
+def test_bedrooms_preferred_over_rooms():
+    info = extract_structured_data(page(listing(numberOfRooms=5, numberOfBedrooms=2)))
+    assert '2 bedrooms' in info['features']
+    assert '5 rooms' not in info['features']
+
+def test_list_valued_name_and_description():
+    info = extract_structured_data(page(listing(name=['Harbour view flat', 'Flat'], description=[DESCRIPTION])))
+    assert info['title'] == 'Harbour view flat'
+    assert info['description'] == DESCRIPTION
+    assert 'balcony' in info['features']
+
+def test_node_valued_name_and_description():
+    info = extract_structured_data(page(listing(name={'@value': 'Harbour view flat'},
+                                                description={'@language': 'en', '@value': DESCRIPTION})))
+    assert info['title'] == 'Harbour view flat'
+    assert info['description'] == DESCRIPTION
+
+def test_early_stop_check_accepts_list_values():
+    assert has_complete_structured_data(page(listing(name=['Harbour view flat'], description=[DESCRIPTION])))